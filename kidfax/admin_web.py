@@ -2,27 +2,53 @@
 """Admin web interface for Kid Fax contact management."""
 from __future__ import annotations
 
+# Optional: gevent makes blocking I/O (file reads, systemctl, uploads)
+# cooperative so one slow request doesn't stall the others. Patching has to
+# happen before socket/subprocess/threading are imported anywhere.
+try:
+    from gevent import monkey
+
+    monkey.patch_all()
+    HAS_GEVENT = True
+except ImportError:
+    HAS_GEVENT = False
+
+import hashlib
+import hmac
 import logging
 import os
 import subprocess
+import threading
 from functools import wraps
+from io import BytesIO
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Set, Tuple
+from typing import Any, Dict, Optional, Set, Tuple
 
 from flask import Flask, render_template, request, Response, jsonify, redirect, url_for, send_file
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON encode/decode
+    orjson = None
 
 from kidfax.avatar_manager import (
     delete_avatar,
     ensure_avatar_dir,
     get_avatar_path,
-    list_avatars,
+    get_avatar_versions,
     process_avatar,
 )
 from kidfax.config_manager import (
     get_contacts_from_env,
     get_allowlist_from_env,
+    get_contact_numbers_from_env,
+    get_sorted_config_from_env,
     save_env_config,
     validate_phone_number,
+    validate_phone_numbers,
     validate_contact_name,
     parse_contacts,
     parse_allowlist,
@@ -35,23 +61,65 @@ logging.basicConfig(
 )
 LOG = logging.getLogger("kidfax.admin_web")
 
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (used by jsonify and request.get_json)."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # For flash messages
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
+# Templates ship with the package; don't re-stat them on every render
+app.config['TEMPLATES_AUTO_RELOAD'] = False
+app.jinja_env.auto_reload = False
+
+# Configuration read once at import instead of on every request
+ENV_FILE_PATH = os.getenv("ENV_FILE_PATH", ".env")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin")
+AVATAR_ENABLED = os.getenv("AVATAR_ENABLED", "true").lower() in {"1", "true", "yes"}
+AVATAR_MAX_FILE_SIZE_BYTES = int(os.getenv("AVATAR_MAX_FILE_SIZE", "5")) * 1024 * 1024
+
+
+# Extra room for multipart boundaries/headers around the uploaded file
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+app.config['MAX_CONTENT_LENGTH'] = AVATAR_MAX_FILE_SIZE_BYTES + UPLOAD_OVERHEAD_BYTES
+
+# send_file hands the open file to the server's wsgi.file_wrapper (sendfile(2)
+# where supported); behind an X-Sendfile proxy, skip Python entirely
+app.config['USE_X_SENDFILE'] = os.getenv("ADMIN_USE_X_SENDFILE", "false").lower() in {"1", "true", "yes"}
+
+
+def _hash_password(password: str) -> bytes:
+    """Hash a password to a fixed-length digest for constant-time comparison."""
+    return hashlib.blake2b(password.encode("utf-8"), digest_size=32).digest()
+
+
+_ADMIN_PW_HASH = _hash_password(ADMIN_PASSWORD)
 
 
 def check_auth(password: str) -> bool:
     """
     Check if provided password matches ADMIN_PASSWORD.
 
+    Compares fixed-length digests with hmac.compare_digest so the check
+    does not leak timing information about the configured password.
+
     Args:
         password: Password to check
 
     Returns:
         True if password matches
     """
-    admin_password = os.getenv("ADMIN_PASSWORD", "admin")
-    return password == admin_password
+    return hmac.compare_digest(_hash_password(password or ""), _ADMIN_PW_HASH)
 
 
 def authenticate() -> Response:
@@ -64,6 +132,53 @@ def authenticate() -> Response:
     )
 
 
+def _json_body() -> Optional[Dict[str, Any]]:
+    """
+    Parse the request body as a JSON object without raising.
+
+    Returns:
+        Parsed dict, or None if the body is missing, malformed, or not an object
+    """
+    data = request.get_json(silent=True, cache=True)
+    return data if isinstance(data, dict) else None
+
+
+def _string_fields(data: Dict[str, Any], *keys: str) -> Optional[Tuple[str, ...]]:
+    """
+    Read string fields from a JSON object, stripped (missing keys become '').
+
+    Returns:
+        Tuple of values in key order, or None if any present value isn't a string
+    """
+    values = tuple(data.get(key, '') for key in keys)
+    if not all(isinstance(value, str) for value in values):
+        return None
+    return tuple(value.strip() for value in values)
+
+
+def _fields_error(*keys: str) -> Tuple[Response, int]:
+    """400 response for a JSON body whose fields aren't all strings."""
+    names = ' and '.join(f"'{key}'" for key in keys)
+    return jsonify({'success': False, 'error': f"{names} must be strings"}), 400
+
+
+def _request_fields(*keys: str) -> Tuple[Tuple[str, ...], Optional[Tuple[Response, int]]]:
+    """
+    Parse the request body and read its string fields.
+
+    Returns:
+        (values, None) on success, or ((), error response) if the body isn't a
+        JSON object or a field isn't a string
+    """
+    data = _json_body()
+    if data is None:
+        return (), (jsonify({'success': False, 'error': 'JSON object required'}), 400)
+    values = _string_fields(data, *keys)
+    if values is None:
+        return (), _fields_error(*keys)
+    return values, None
+
+
 def requires_auth(f):
     """Decorator to require HTTP basic authentication."""
     @wraps(f)
@@ -79,6 +194,16 @@ def requires_auth(f):
     return decorated
 
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Reject oversize uploads before the body is buffered."""
+    max_mb = AVATAR_MAX_FILE_SIZE_BYTES // (1024 * 1024)
+    return jsonify({
+        'success': False,
+        'error': f'File too large (max {max_mb}MB)'
+    }), 413
+
+
 @app.route('/')
 def index():
     """Redirect root to /admin."""
@@ -94,38 +219,27 @@ def admin_dashboard():
     Requires HTTP basic authentication.
     """
     try:
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
-
-        # Load current configuration
-        contacts = get_contacts_from_env(env_path)
-        allowlist = get_allowlist_from_env(env_path)
+        env_path = ENV_FILE_PATH
 
-        # Initialize avatar directory
-        ensure_avatar_dir()
+        # Load current configuration (pre-sorted, cached until .env changes)
+        sorted_contacts, sorted_allowlist = get_sorted_config_from_env(env_path)
 
-        # Check which contacts have avatars
-        avatars = list_avatars()
-        contacts_with_avatars = {name.lower() for name in avatars.keys()}
+        # Check which contacts have avatars (mtimes recorded by the index scan)
+        avatar_versions = get_avatar_versions()
 
-        # Map contacts to F-keys (F1-F12) with avatar status
+        # Map contacts to F-keys (F1-F12) with avatar version (mtime, or None if no avatar)
+        # The version is appended to the avatar URL so re-uploads bust the browser cache
         fkey_contacts = []
-        for i, (name, number) in enumerate(sorted(contacts.items()), start=1):
-            if i > 12:  # Max 12 contacts for keyboard mode
-                break
-            has_avatar = name.lower() in contacts_with_avatars
-            fkey_contacts.append((f"F{i}", name, number, has_avatar))
-
-        # Check if avatars are enabled
-        avatar_enabled = os.getenv("AVATAR_ENABLED", "true").lower() in {"1", "true", "yes"}
+        for i, (name, number) in enumerate(islice(sorted_contacts, 12), start=1):  # Max 12 for keyboard mode
+            fkey_contacts.append((f"F{i}", name, number, avatar_versions.get(name.lower())))
 
         return render_template(
             'admin.html',
             contacts=fkey_contacts,
-            all_contacts=contacts,
-            allowlist=sorted(allowlist),
+            allowlist=sorted_allowlist,
             max_contacts=12,
-            contact_count=len(contacts),
-            avatar_enabled=avatar_enabled
+            contact_count=len(sorted_contacts),
+            avatar_enabled=AVATAR_ENABLED
         )
 
     except FileNotFoundError as e:
@@ -153,9 +267,10 @@ def add_contact():
         JSON response with success/error
     """
     try:
-        data = request.get_json()
-        name = data.get('name', '').strip()
-        number = data.get('number', '').strip()
+        fields, error = _request_fields('name', 'number')
+        if error:
+            return error
+        name, number = fields
 
         # Validate contact name
         valid, error = validate_contact_name(name)
@@ -168,7 +283,7 @@ def add_contact():
             return jsonify({'success': False, 'error': error}), 400
 
         # Load current contacts
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
+        env_path = ENV_FILE_PATH
         contacts = get_contacts_from_env(env_path)
         allowlist = get_allowlist_from_env(env_path)
 
@@ -180,7 +295,7 @@ def add_contact():
             }), 400
 
         # Check for duplicate number
-        if number in contacts.values():
+        if number in get_contact_numbers_from_env(env_path):
             return jsonify({
                 'success': False,
                 'error': f"Number {number} already assigned to another contact"
@@ -227,10 +342,10 @@ def edit_contact():
         JSON response with success/error
     """
     try:
-        data = request.get_json()
-        old_name = data.get('old_name', '').strip()
-        new_name = data.get('new_name', '').strip()
-        new_number = data.get('new_number', '').strip()
+        fields, error = _request_fields('old_name', 'new_name', 'new_number')
+        if error:
+            return error
+        old_name, new_name, new_number = fields
 
         # Validate new name
         valid, error = validate_contact_name(new_name)
@@ -243,7 +358,7 @@ def edit_contact():
             return jsonify({'success': False, 'error': error}), 400
 
         # Load current contacts
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
+        env_path = ENV_FILE_PATH
         contacts = get_contacts_from_env(env_path)
         allowlist = get_allowlist_from_env(env_path)
 
@@ -261,6 +376,14 @@ def edit_contact():
                 'error': f"Contact '{new_name}' already exists"
             }), 400
 
+        # Check new number isn't assigned to a different contact
+        owner = get_contact_numbers_from_env(env_path).get(new_number)
+        if owner is not None and owner != old_name:
+            return jsonify({
+                'success': False,
+                'error': f"Number {new_number} already assigned to another contact"
+            }), 400
+
         # Remove old contact
         del contacts[old_name]
 
@@ -281,6 +404,89 @@ def edit_contact():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/admin/contacts/bulk_replace', methods=['POST'])
+@requires_auth
+def bulk_replace_contacts():
+    """
+    Replace the whole contact list in a single .env write.
+
+    Request JSON:
+        {
+            "contacts": [
+                {"name": "grandma", "number": "+15551112222"},
+                {"name": "uncle", "number": "+15553334444"}
+            ]
+        }
+
+    Returns:
+        JSON response with success/error
+    """
+    try:
+        data = _json_body()
+        if data is None:
+            return jsonify({'success': False, 'error': 'JSON object required'}), 400
+
+        entries = data.get('contacts')
+        if not isinstance(entries, list):
+            return jsonify({'success': False, 'error': "'contacts' must be a list"}), 400
+
+        # Check max contacts limit
+        if len(entries) > 12:
+            return jsonify({
+                'success': False,
+                'error': "Maximum 12 contacts allowed (F1-F12 keyboard limit)"
+            }), 400
+
+        if not all(isinstance(entry, dict) for entry in entries):
+            return jsonify({'success': False, 'error': 'Each contact must be an object'}), 400
+        # Reject null/number/object values rather than saving str(None) as a name
+        pairs = [_string_fields(entry, 'name', 'number') for entry in entries]
+        if None in pairs:
+            return _fields_error('name', 'number')
+        numbers_valid = validate_phone_numbers(number for _, number in pairs)
+
+        contacts: Dict[str, str] = {}
+        numbers: Set[str] = set()
+        for (name, number), number_valid in zip(pairs, numbers_valid):
+            valid, error = validate_contact_name(name)
+            if not valid:
+                return jsonify({'success': False, 'error': error}), 400
+
+            if not number_valid:
+                _, error = validate_phone_number(number)  # for the specific message
+                return jsonify({'success': False, 'error': error}), 400
+
+            if name in contacts:
+                return jsonify({
+                    'success': False,
+                    'error': f"Contact '{name}' listed more than once"
+                }), 400
+
+            if number in numbers:
+                return jsonify({
+                    'success': False,
+                    'error': f"Number {number} assigned to more than one contact"
+                }), 400
+
+            contacts[name] = number
+            numbers.add(number)
+
+        # Save to .env once for the whole batch
+        env_path = ENV_FILE_PATH
+        allowlist = get_allowlist_from_env(env_path)
+        save_env_config(contacts, allowlist, env_path)
+
+        LOG.info(f"Contacts replaced: {len(contacts)} contacts")
+        return jsonify({
+            'success': True,
+            'message': f"Saved {len(contacts)} contacts"
+        })
+
+    except Exception as e:
+        LOG.error(f"Error replacing contacts: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/admin/contacts/delete', methods=['POST'])
 @requires_auth
 def delete_contact():
@@ -296,11 +502,13 @@ def delete_contact():
         JSON response with success/error
     """
     try:
-        data = request.get_json()
-        name = data.get('name', '').strip()
+        fields, error = _request_fields('name')
+        if error:
+            return error
+        name = fields[0]
 
         # Load current contacts
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
+        env_path = ENV_FILE_PATH
         contacts = get_contacts_from_env(env_path)
         allowlist = get_allowlist_from_env(env_path)
 
@@ -343,8 +551,10 @@ def add_to_allowlist():
         JSON response with success/error
     """
     try:
-        data = request.get_json()
-        number = data.get('number', '').strip()
+        fields, error = _request_fields('number')
+        if error:
+            return error
+        number = fields[0]
 
         # Validate phone number
         valid, error = validate_phone_number(number)
@@ -352,7 +562,7 @@ def add_to_allowlist():
             return jsonify({'success': False, 'error': error}), 400
 
         # Load current configuration
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
+        env_path = ENV_FILE_PATH
         contacts = get_contacts_from_env(env_path)
         allowlist = get_allowlist_from_env(env_path)
 
@@ -395,11 +605,13 @@ def remove_from_allowlist():
         JSON response with success/error
     """
     try:
-        data = request.get_json()
-        number = data.get('number', '').strip()
+        fields, error = _request_fields('number')
+        if error:
+            return error
+        number = fields[0]
 
         # Load current configuration
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
+        env_path = ENV_FILE_PATH
         contacts = get_contacts_from_env(env_path)
         allowlist = get_allowlist_from_env(env_path)
 
@@ -427,12 +639,35 @@ def remove_from_allowlist():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+RESTART_COMMAND = ['sudo', 'systemctl', 'restart', 'kidfax']
+
+
+def _log_restart_result(process: subprocess.Popen) -> None:
+    """Reap the detached restart process and log how it went."""
+    try:
+        _, stderr = process.communicate(timeout=30)
+    except subprocess.TimeoutExpired:
+        # Kill and reap it so the timed-out child doesn't linger as a zombie
+        process.kill()
+        process.communicate()
+        LOG.error("Service restart timed out")
+        return
+
+    if process.returncode == 0:
+        LOG.info("Kid Fax service restarted successfully")
+    else:
+        LOG.error(f"Service restart failed: {stderr or 'Unknown error'}")
+
+
 @app.route('/admin/restart', methods=['POST'])
 @requires_auth
 def restart_service():
     """
     Restart Kid Fax systemd service.
 
+    The restart runs detached so the request returns immediately (202) instead
+    of holding the worker while systemctl runs; the outcome is logged.
+
     Requires sudo permissions for pi user:
     Add to /etc/sudoers.d/kidfax:
         pi ALL=(ALL) NOPASSWD: /bin/systemctl restart kidfax
@@ -441,33 +676,20 @@ def restart_service():
         JSON response with success/error
     """
     try:
-        result = subprocess.run(
-            ['sudo', 'systemctl', 'restart', 'kidfax'],
-            capture_output=True,
-            timeout=10,
-            text=True
+        process = subprocess.Popen(
+            RESTART_COMMAND,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True,
         )
+        threading.Thread(target=_log_restart_result, args=(process,), daemon=True).start()
 
-        if result.returncode == 0:
-            LOG.info("Kid Fax service restarted successfully")
-            return jsonify({
-                'success': True,
-                'message': "Kid Fax service restarted successfully"
-            })
-        else:
-            error_msg = result.stderr or "Unknown error"
-            LOG.error(f"Service restart failed: {error_msg}")
-            return jsonify({
-                'success': False,
-                'error': f"Restart failed: {error_msg}"
-            }), 500
-
-    except subprocess.TimeoutExpired:
-        LOG.error("Service restart timed out")
+        LOG.info("Kid Fax service restart initiated")
         return jsonify({
-            'success': False,
-            'error': "Restart command timed out"
-        }), 500
+            'success': True,
+            'message': "Kid Fax service restart initiated"
+        }), 202
 
     except FileNotFoundError:
         LOG.warning("systemctl not found or sudo not configured")
@@ -499,7 +721,7 @@ def upload_avatar():
         avatar_file = request.files.get('avatar_file')
 
         # Validate contact exists
-        env_path = os.getenv("ENV_FILE_PATH", ".env")
+        env_path = ENV_FILE_PATH
         contacts = get_contacts_from_env(env_path)
 
         if contact_name not in contacts:
@@ -522,20 +744,18 @@ def upload_avatar():
                 'error': 'Only PNG files allowed'
             }), 400
 
-        # Validate file size (max 5MB)
-        avatar_file.seek(0, os.SEEK_END)
-        file_size = avatar_file.tell()
-        avatar_file.seek(0)
-
-        max_size = int(os.getenv("AVATAR_MAX_FILE_SIZE", "5")) * 1024 * 1024
-        if file_size > max_size:
+        # Validate file size (max 5MB) with a bounded read; oversize request
+        # bodies are already rejected by MAX_CONTENT_LENGTH before we get here
+        max_size = AVATAR_MAX_FILE_SIZE_BYTES
+        file_data = avatar_file.read(max_size + 1)
+        if len(file_data) > max_size:
             return jsonify({
                 'success': False,
                 'error': f'File too large (max {max_size // (1024*1024)}MB)'
             }), 400
 
         # Process and save avatar
-        avatar_path = process_avatar(avatar_file, contact_name)
+        avatar_path = process_avatar(BytesIO(file_data), contact_name)
 
         LOG.info(f"Avatar uploaded for {contact_name}: {avatar_path}")
         return jsonify({
@@ -544,6 +764,9 @@ def upload_avatar():
             'avatar_url': f"/admin/avatars/{contact_name}.png"
         })
 
+    except RequestEntityTooLarge:
+        raise
+
     except ValueError as e:
         LOG.error(f"Validation error uploading avatar: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -563,14 +786,25 @@ def get_avatar(contact_name):
         contact_name: Name of the contact
 
     Returns:
-        PNG image file or 404 if not found
+        PNG image file (or 304 Not Modified) or 404 if not found
     """
     avatar_path = get_avatar_path(contact_name)
 
     if not avatar_path or not avatar_path.exists():
         return Response("Avatar not found", 404)
 
-    return send_file(avatar_path, mimetype='image/png')
+    # Conditional response (ETag/Last-Modified) lets the browser revalidate with a 304
+    response = send_file(
+        avatar_path,
+        mimetype='image/png',
+        conditional=True,
+        etag=True,
+        max_age=3600,
+    )
+    response.cache_control.private = True
+    response.cache_control.public = False
+    response.cache_control.must_revalidate = True
+    return response
 
 
 @app.route('/admin/avatars/delete', methods=['POST'])
@@ -588,8 +822,10 @@ def delete_avatar_route():
         JSON response with success/error
     """
     try:
-        data = request.get_json()
-        contact_name = data.get('contact_name', '').strip()
+        fields, error = _request_fields('contact_name')
+        if error:
+            return error
+        contact_name = fields[0]
 
         if not contact_name:
             return jsonify({
@@ -625,13 +861,19 @@ def main():
         LOG.warning("Please set ADMIN_PASSWORD in .env for security!")
 
     # Check if .env file exists
-    env_path = os.getenv("ENV_FILE_PATH", ".env")
+    env_path = ENV_FILE_PATH
     if not os.path.exists(env_path):
         LOG.error(f".env file not found at {env_path}")
         print(f"Error: .env file not found at {env_path}")
         print("Please create .env file with CONTACTS and ALLOWLIST configuration.")
         return
 
+    # Initialize avatar directory once rather than on every dashboard render
+    ensure_avatar_dir()
+
+    # Compile the dashboard template up front so the first request doesn't pay for it
+    app.jinja_env.get_template('admin.html')
+
     # Determine host and port
     host = os.getenv("ADMIN_HOST", "127.0.0.1")  # Default: localhost only
     port = int(os.getenv("ADMIN_PORT", "5000"))
@@ -648,8 +890,14 @@ def main():
     print("Press Ctrl+C to stop")
     print("=" * 60)
 
-    # Run Flask app
-    app.run(host=host, port=port, debug=False)
+    # Run under gevent when installed, otherwise Flask's threaded server
+    if HAS_GEVENT:
+        from gevent.pywsgi import WSGIServer
+
+        LOG.info("Serving admin UI with gevent WSGIServer")
+        WSGIServer((host, port), app, log=None).serve_forever()
+    else:
+        app.run(host=host, port=port, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
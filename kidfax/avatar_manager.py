@@ -5,27 +5,58 @@ for printing on SMS receipts.
 """
 from __future__ import annotations
 
+import functools
 import logging
 import os
+import struct
+import threading
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 
+import PIL
 from PIL import Image
 
-__all__ = ["get_avatar_path", "process_avatar", "delete_avatar", "ensure_avatar_dir", "_process_image"]
+__all__ = [
+    "get_avatar_versions",
+    "get_avatar_path",
+    "get_avatar_packed",
+    "process_avatar",
+    "delete_avatar",
+    "ensure_avatar_dir",
+    "_process_image",
+]
 
 LOGGER = logging.getLogger(__name__)
 
+# In-memory index of avatar files, rebuilt when the avatar directory's mtime changes
+_AVATAR_INDEX: Dict[str, Path] = {}  # exact stem -> path
+_AVATAR_INDEX_LOWER: Dict[str, Path] = {}  # lowercased stem -> path
+_AVATAR_VERSIONS: Dict[str, int] = {}  # lowercased stem -> file mtime (seconds)
+_AVATAR_INDEX_MTIME: Optional[int] = None
+_AVATAR_INDEX_LOCK = threading.Lock()
 
+# Set once the avatar directory is known to exist, so uploads skip the mkdir
+_AVATAR_DIR_READY = False
+
+# Pre-packed raster companion files: "<HH" (width, height) header followed by
+# MSB-first rows padded to whole bytes, with 1 = black (ESC/POS polarity)
+PACKED_SUFFIX = ".bin"
+_PACKED_HEADER = struct.Struct("<HH")
+_INVERT_TABLE = bytes(range(255, -1, -1))
+
+
+@functools.lru_cache(maxsize=1)
 def get_avatar_dir() -> Path:
-    """Get the avatar storage directory path from environment or default."""
+    """Get the avatar storage directory path from environment or default (read once)."""
     default_dir = Path.home() / ".kidfax_avatars"
     avatar_dir = os.getenv("AVATAR_DIR", str(default_dir))
     return Path(avatar_dir)
 
 
+@functools.lru_cache(maxsize=1)
 def get_avatar_size() -> int:
-    """Get the target avatar size from environment or default."""
+    """Get the target avatar size from environment or default (read once)."""
     size_str = os.getenv("AVATAR_SIZE", "96")
     try:
         size = int(size_str)
@@ -41,9 +72,56 @@ def get_avatar_size() -> int:
 
 def ensure_avatar_dir() -> None:
     """Create avatar directory if it doesn't exist."""
+    global _AVATAR_DIR_READY
     avatar_dir = get_avatar_dir()
     avatar_dir.mkdir(parents=True, exist_ok=True)
+    _AVATAR_DIR_READY = True
     LOGGER.info(f"Avatar directory: {avatar_dir}")
+    LOGGER.info(f"Image processing: Pillow {PIL.__version__}")
+
+
+def _invalidate_avatar_index() -> None:
+    """Force the avatar index to be rebuilt on next lookup."""
+    global _AVATAR_INDEX_MTIME
+    with _AVATAR_INDEX_LOCK:
+        _AVATAR_INDEX_MTIME = None
+
+
+def _refresh_avatar_index() -> Tuple[Dict[str, Path], Dict[str, Path], Dict[str, int]]:
+    """
+    Return (exact, lowercase) stem → path indexes and lowercase stem → mtime
+    versions, rescanning only on change.
+
+    Returns empty indexes if the avatar directory doesn't exist.
+    """
+    global _AVATAR_INDEX, _AVATAR_INDEX_LOWER, _AVATAR_VERSIONS, _AVATAR_INDEX_MTIME
+    avatar_dir = get_avatar_dir()
+    try:
+        mtime_ns = avatar_dir.stat().st_mtime_ns
+    except OSError:
+        return {}, {}, {}
+
+    with _AVATAR_INDEX_LOCK:
+        if mtime_ns != _AVATAR_INDEX_MTIME:
+            exact: Dict[str, Path] = {}
+            lower: Dict[str, Path] = {}
+            versions: Dict[str, int] = {}
+            with os.scandir(avatar_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".png") or not entry.is_file():
+                        continue
+                    stem = entry.name[:-4]
+                    path = Path(entry.path)
+                    exact[stem] = path
+                    if stem.lower() not in lower:
+                        try:
+                            versions[stem.lower()] = int(entry.stat().st_mtime)
+                        except OSError:
+                            continue  # removed mid-scan
+                        lower[stem.lower()] = path
+            _AVATAR_INDEX, _AVATAR_INDEX_LOWER, _AVATAR_VERSIONS = exact, lower, versions
+            _AVATAR_INDEX_MTIME = mtime_ns
+        return _AVATAR_INDEX, _AVATAR_INDEX_LOWER, _AVATAR_VERSIONS
 
 
 def get_avatar_path(contact_name: str) -> Optional[Path]:
@@ -59,22 +137,57 @@ def get_avatar_path(contact_name: str) -> Optional[Path]:
     if not contact_name:
         return None
 
-    avatar_dir = get_avatar_dir()
-    if not avatar_dir.exists():
+    exact, lower, _ = _refresh_avatar_index()
+
+    # Try exact match first, then case-insensitive match
+    return exact.get(contact_name) or lower.get(contact_name.lower())
+
+
+def _pack_image(image: Image.Image) -> bytes:
+    """Pack a 1-bit PIL image into the printer raster format (see PACKED_SUFFIX)."""
+    # PIL's "1" mode already packs rows MSB-first padded to bytes, but uses 1 = white
+    bits = bytearray(image.tobytes().translate(_INVERT_TABLE))
+    pad = -image.width % 8
+    if pad:
+        # PIL pads rows with 0 (white); inverted they'd print as a black stripe
+        row_bytes = (image.width + 7) // 8
+        mask = (0xFF << pad) & 0xFF
+        bits[row_bytes - 1::row_bytes] = bytes(b & mask for b in bits[row_bytes - 1::row_bytes])
+    return _PACKED_HEADER.pack(image.width, image.height) + bytes(bits)
+
+
+def get_avatar_packed(contact_name: str) -> Optional[bytes]:
+    """
+    Get the pre-packed printer raster for a contact's avatar.
+
+    Args:
+        contact_name: Name of the contact (case-insensitive lookup)
+
+    Returns:
+        Packed raster bytes (header + bits), or None if no packed avatar exists
+    """
+    avatar_path = get_avatar_path(contact_name)
+    if not avatar_path:
+        return None
+    try:
+        with open(avatar_path.with_suffix(PACKED_SUFFIX), 'rb') as f:
+            return f.read()
+    except OSError:
         return None
 
-    # Try exact match first
-    exact_path = avatar_dir / f"{contact_name}.png"
-    if exact_path.exists():
-        return exact_path
 
-    # Try case-insensitive match
-    contact_lower = contact_name.lower()
-    for avatar_file in avatar_dir.glob("*.png"):
-        if avatar_file.stem.lower() == contact_lower:
-            return avatar_file
+def get_avatar_versions() -> Mapping[str, int]:
+    """
+    Get a read-only view of avatar versions keyed by lowercased contact name.
 
-    return None
+    The version is the file's mtime in seconds, recorded when the avatar
+    index is rebuilt, so callers can cache-bust without stat'ing each file.
+
+    Returns:
+        Mapping of lowercased contact name → avatar mtime (not a copy)
+    """
+    _, _, versions = _refresh_avatar_index()
+    return MappingProxyType(versions)
 
 
 def _process_image(source: Image.Image, target_size: int = 96) -> Image.Image:
@@ -92,26 +205,34 @@ def _process_image(source: Image.Image, target_size: int = 96) -> Image.Image:
     Returns:
         Processed 1-bit PNG Image ready for printing
     """
+    # Already processed (1-bit at target size): nothing to do
+    if source.mode == "1" and source.size == (target_size, target_size):
+        return source
+
     # Step 1: Convert to RGB (remove alpha/transparency)
+    # Grayscale stays in L: one channel through resize and dither instead of three
     if source.mode not in ("RGB", "L"):
         img = source.convert("RGB")
-    elif source.mode == "L":
-        # Grayscale images convert to RGB for consistent processing
-        img = source.convert("RGB")
     else:
         img = source
 
     # Step 2: Resize maintaining aspect ratio
     img.thumbnail((target_size, target_size), Image.Resampling.LANCZOS)
 
-    # Step 3: Center on white canvas
-    canvas = Image.new("RGB", (target_size, target_size), (255, 255, 255))
-    offset_x = (target_size - img.width) // 2
-    offset_y = (target_size - img.height) // 2
-    canvas.paste(img, (offset_x, offset_y))
+    # Step 3: Center on white canvas (skip if already square at target size)
+    if img.size == (target_size, target_size):
+        canvas = img
+    else:
+        white = 255 if img.mode == "L" else (255, 255, 255)
+        canvas = Image.new(img.mode, (target_size, target_size), white)
+        offset_x = (target_size - img.width) // 2
+        offset_y = (target_size - img.height) // 2
+        canvas.paste(img, (offset_x, offset_y))
 
     # Step 4: Dither to monochrome (thermal printer)
-    # This creates the pixel art aesthetic perfect for thermal printers
+    # This creates the pixel art aesthetic perfect for thermal printers.
+    # Pillow's dither is a C loop over the already-downscaled canvas (tens of
+    # microseconds at 96x96); the LANCZOS resize above is the real cost.
     dithered = canvas.convert("1", dither=Image.Dither.FLOYDSTEINBERG)
 
     return dithered
@@ -143,6 +264,7 @@ def process_avatar(uploaded_file, contact_name: str) -> Path:
         ValueError: If image cannot be processed
         OSError: If avatar directory cannot be created
     """
+    global _AVATAR_DIR_READY
     if not contact_name:
         raise ValueError("Contact name is required")
 
@@ -160,13 +282,17 @@ def process_avatar(uploaded_file, contact_name: str) -> Path:
         # Process using shared pipeline
         processed = _process_image(img, target_size=target_size)
 
-        # Ensure avatar directory exists
+        # Ensure avatar directory exists (once per process)
         avatar_dir = get_avatar_dir()
-        avatar_dir.mkdir(parents=True, exist_ok=True)
+        if not _AVATAR_DIR_READY:
+            avatar_dir.mkdir(parents=True, exist_ok=True)
+            _AVATAR_DIR_READY = True
 
         # Save to avatar directory
         avatar_path = avatar_dir / f"{contact_name}.png"
         processed.save(avatar_path, "PNG")
+        avatar_path.with_suffix(PACKED_SUFFIX).write_bytes(_pack_image(processed))
+        _invalidate_avatar_index()
 
         LOGGER.info(f"Avatar saved: {avatar_path} ({avatar_path.stat().st_size} bytes)")
         return avatar_path
@@ -194,27 +320,10 @@ def delete_avatar(contact_name: str) -> bool:
 
     try:
         avatar_path.unlink()
+        avatar_path.with_suffix(PACKED_SUFFIX).unlink(missing_ok=True)
+        _invalidate_avatar_index()
         LOGGER.info(f"Deleted avatar: {avatar_path}")
         return True
     except Exception as exc:
         LOGGER.error(f"Failed to delete avatar for '{contact_name}': {exc}")
         return False
-
-
-def list_avatars() -> dict[str, Path]:
-    """
-    List all available avatars.
-
-    Returns:
-        Dictionary mapping contact names to avatar paths
-    """
-    avatar_dir = get_avatar_dir()
-    if not avatar_dir.exists():
-        return {}
-
-    avatars = {}
-    for avatar_file in avatar_dir.glob("*.png"):
-        contact_name = avatar_file.stem
-        avatars[contact_name] = avatar_file
-
-    return avatars
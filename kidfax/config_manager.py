@@ -2,17 +2,48 @@
 """Configuration management for Kid Fax .env files."""
 from __future__ import annotations
 
+import functools
+import io
 import logging
 import os
 import re
 import shutil
+import threading
 from pathlib import Path
-from typing import Dict, Set, Tuple
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Set, Tuple
+
+from kidfax.state_store import atomic_write
 
 LOG = logging.getLogger("kidfax.config")
 
 # Phone number validation regex (E.164 format)
 PHONE_REGEX = re.compile(r'^\+[1-9]\d{1,14}$')
+# Same rule, one number per line, for validating many numbers in a single scan
+_BULK_PHONE_REGEX = re.compile(r'^\+[1-9]\d{1,14}$', re.MULTILINE)
+# Characters that would break the CONTACTS "name:number,..." format
+_BAD_NAME_CHARS = re.compile(r'[:,]')
+# One "name:number" CONTACTS entry, anchored to the start of a comma-separated
+# chunk; the non-space anchors skip empty names/numbers
+_CONTACT_RE = re.compile(r'(?:^|(?<=,))\s*([^:,\s][^:,]*?)\s*:\s*([^,\s][^,]*?)\s*(?:,|$)')
+
+# One KEY=VALUE assignment per line; comment lines (leading '#') never match
+_ENV_LINE_RE = re.compile(r'(?m)^[ \t]*([^#=\s][^=\n]*?)[ \t]*=[ \t]*(.*?)[ \t]*$')
+
+
+class _EnvCacheEntry(NamedTuple):
+    """Parsed CONTACTS/ALLOWLIST for one .env file at a given mtime."""
+    mtime_ns: int
+    contacts: Dict[str, str]
+    numbers: Dict[str, str]  # phone number -> contact name
+    allowlist: Set[str]
+    sorted_contacts: Tuple[Tuple[str, str], ...]
+    sorted_allowlist: Tuple[str, ...]
+
+
+# Parsed config per .env path, keyed by file mtime (st_mtime_ns)
+_ENV_CACHE: Dict[str, _EnvCacheEntry] = {}
+_ENV_CACHE_LOCK = threading.Lock()
 
 
 def parse_contacts(raw: str) -> Dict[str, str]:
@@ -29,16 +60,45 @@ def parse_contacts(raw: str) -> Dict[str, str]:
         >>> parse_contacts("grandma:+15551112222,uncle:+15553334444")
         {'grandma': '+15551112222', 'uncle': '+15553334444'}
     """
-    contacts: Dict[str, str] = {}
-    for chunk in raw.split(','):
-        if ':' not in chunk:
-            continue
-        name, number = chunk.split(':', 1)
-        name = name.strip()
-        number = number.strip()
-        if name and number:
-            contacts[name] = number
-    return contacts
+    return dict(_parse_contact_items(raw))
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_contact_items(raw: str) -> Tuple[Tuple[str, str], ...]:
+    """Memoized CONTACTS parse; returns immutable pairs so callers can't share state."""
+    return tuple(dict(_CONTACT_RE.findall(raw)).items())
+
+
+def parse_chat_contacts(raw: str) -> Dict[str, int]:
+    """
+    Parse a Telegram CONTACTS value into name→chat_id mapping.
+
+    Same format as parse_contacts(), but values must be integer chat IDs;
+    entries that aren't are logged and skipped.
+
+    Args:
+        raw: Comma-separated contacts in format "name:123456789,..."
+
+    Returns:
+        Dictionary mapping contact names to chat IDs
+
+    Example:
+        >>> parse_chat_contacts("grandma:123456789,uncle:987654321")
+        {'grandma': 123456789, 'uncle': 987654321}
+    """
+    return dict(_parse_chat_contact_items(raw))
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_chat_contact_items(raw: str) -> Tuple[Tuple[str, int], ...]:
+    """Memoized Telegram CONTACTS parse (invalid IDs are only logged once)."""
+    contacts: Dict[str, int] = {}
+    for name, chat_id in _CONTACT_RE.findall(raw):
+        try:
+            contacts[name] = int(chat_id)
+        except ValueError:
+            LOG.warning(f"Invalid chat ID for {name}: {chat_id}")
+    return tuple(contacts.items())
 
 
 def serialize_contacts(contacts: Dict[str, str]) -> str:
@@ -92,6 +152,7 @@ def serialize_allowlist(numbers: Set[str]) -> str:
     return ','.join(sorted(numbers))
 
 
+@functools.lru_cache(maxsize=256)
 def validate_phone_number(number: str) -> Tuple[bool, str]:
     """
     Validate phone number in E.164 format.
@@ -108,18 +169,41 @@ def validate_phone_number(number: str) -> Tuple[bool, str]:
         >>> validate_phone_number("555-123-4567")
         (False, 'Phone number must start with + (E.164 format)')
     """
+    # One regex call on the common (valid) path; decode the reason only on failure
+    if PHONE_REGEX.match(number):
+        return (True, "")
+
     if not number:
         return (False, "Phone number is required")
 
-    if not number.startswith('+'):
+    if number[0] != '+':
         return (False, "Phone number must start with + (E.164 format)")
 
-    if not PHONE_REGEX.match(number):
-        return (False, "Invalid phone format. Use E.164: +1234567890 (1-15 digits)")
+    return (False, "Invalid phone format. Use E.164: +1234567890 (1-15 digits)")
 
-    return (True, "")
 
+def validate_phone_numbers(numbers: Iterable[str]) -> List[bool]:
+    """
+    Validate many phone numbers (E.164) with one regex scan.
+
+    Args:
+        numbers: Phone number strings
+
+    Returns:
+        List of booleans, one per input, True where the number is valid
+
+    Example:
+        >>> validate_phone_numbers(["+15551234567", "555-123-4567"])
+        [True, False]
+    """
+    numbers = list(numbers)
+    # Embedded newlines would let fragments match as separate lines
+    candidates = [number for number in numbers if '\n' not in number]
+    valid = set(_BULK_PHONE_REGEX.findall('\n'.join(candidates)))
+    return [number in valid and '\n' not in number for number in numbers]
 
+
+@functools.lru_cache(maxsize=256)
 def validate_contact_name(name: str) -> Tuple[bool, str]:
     """
     Validate contact name.
@@ -133,7 +217,7 @@ def validate_contact_name(name: str) -> Tuple[bool, str]:
     if not name:
         return (False, "Contact name is required")
 
-    if ':' in name or ',' in name:
+    if _BAD_NAME_CHARS.search(name):
         return (False, "Contact name cannot contain ':' or ','")
 
     if len(name) > 50:
@@ -146,6 +230,9 @@ def load_env_config(env_path: str = ".env") -> Dict[str, str]:
     """
     Load .env file into dictionary.
 
+    Parsed results are cached by (path, mtime, size), so repeated loads of an
+    unchanged file don't touch the disk beyond a single stat().
+
     Args:
         env_path: Path to .env file (default: ".env")
 
@@ -156,20 +243,22 @@ def load_env_config(env_path: str = ".env") -> Dict[str, str]:
         FileNotFoundError: If .env file doesn't exist
     """
     path = Path(env_path)
-    if not path.exists():
-        raise FileNotFoundError(f".env file not found at {path}")
-
-    config = {}
-    with open(path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-            # Parse KEY=VALUE
-            if '=' in line:
-                key, value = line.split('=', 1)
-                config[key.strip()] = value.strip()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f".env file not found at {path}") from None
+
+    return dict(_read_env_file(str(path), st.st_mtime_ns, st.st_size))
+
+
+@functools.lru_cache(maxsize=4)
+def _read_env_file(env_path: str, mtime_ns: int, size: int) -> Dict[str, str]:
+    """Parse an .env file; mtime_ns/size are only part of the cache key."""
+    with open(env_path, 'r') as f:
+        data = f.read()
+
+    # Single regex scan over the whole file (comments/blank lines don't match)
+    config = {match.group(1): match.group(2) for match in _ENV_LINE_RE.finditer(data)}
 
     LOG.debug(f"Loaded {len(config)} variables from {env_path}")
     return config
@@ -184,12 +273,13 @@ def save_env_config(
     Safely update .env file while preserving structure.
 
     Strategy:
-    1. Read entire .env file line by line
+    1. Read entire .env file once
     2. Identify lines to update (CONTACTS=..., ALLOWLIST=...)
     3. Replace only those lines
     4. Preserve all other lines and comments
-    5. Write to temp file
-    6. Atomic rename to .env
+    5. Skip the write entirely if nothing changed; otherwise back up the original
+    6. Write to a uniquely named temp file (O_EXCL) and fsync it
+    7. Atomic os.replace onto .env, then fsync the directory
 
     Args:
         contacts: Dictionary of contact name → phone number
@@ -200,57 +290,102 @@ def save_env_config(
         FileNotFoundError: If .env file doesn't exist
     """
     path = Path(env_path)
-    if not path.exists():
-        raise FileNotFoundError(f".env file not found at {path}")
-
-    # Backup original
-    backup_path = Path(f"{env_path}.backup")
-    shutil.copy(path, backup_path)
-    LOG.info(f"Created backup at {backup_path}")
 
     # Serialize new values
-    contacts_str = serialize_contacts(contacts)
-    allowlist_str = serialize_allowlist(allowlist)
+    contacts_line = f"CONTACTS={serialize_contacts(contacts)}\n"
+    allowlist_line = f"ALLOWLIST={serialize_allowlist(allowlist)}\n"
 
-    # Read original lines
-    with open(path, 'r') as f:
-        lines = f.readlines()
+    # Read original file once; it also becomes the backup contents
+    try:
+        with open(path, 'r') as f:
+            original = f.read()
+    except FileNotFoundError as exc:
+        raise FileNotFoundError(f".env file not found at {path}") from exc
 
     # Update specific lines
     updated_lines = []
     contacts_found = False
     allowlist_found = False
 
-    for line in lines:
-        if line.strip().startswith('CONTACTS='):
-            updated_lines.append(f"CONTACTS={contacts_str}\n")
+    for line in io.StringIO(original):
+        stripped = line.strip()
+        if stripped.startswith('CONTACTS='):
+            updated_lines.append(contacts_line)
             contacts_found = True
-        elif line.strip().startswith('ALLOWLIST='):
-            updated_lines.append(f"ALLOWLIST={allowlist_str}\n")
+        elif stripped.startswith('ALLOWLIST='):
+            updated_lines.append(allowlist_line)
             allowlist_found = True
         else:
             updated_lines.append(line)
 
     # If CONTACTS or ALLOWLIST not found, append them
     if not contacts_found:
-        updated_lines.append(f"\nCONTACTS={contacts_str}\n")
+        updated_lines.append(f"\n{contacts_line}")
         LOG.warning("CONTACTS not found in .env, appending")
 
     if not allowlist_found:
-        updated_lines.append(f"ALLOWLIST={allowlist_str}\n")
+        updated_lines.append(allowlist_line)
         LOG.warning("ALLOWLIST not found in .env, appending")
 
-    # Atomic write
-    temp_path = Path(f"{env_path}.tmp")
-    with open(temp_path, 'w') as f:
-        f.writelines(updated_lines)
+    updated = ''.join(updated_lines)
+    if updated == original:
+        LOG.debug(f"No changes to {env_path}, skipping write")
+        return
+
+    # Backup original
+    backup_path = Path(f"{env_path}.backup")
+    with open(backup_path, 'w') as f:
+        f.write(original)
+    shutil.copymode(path, backup_path)
+    LOG.info(f"Created backup at {backup_path}")
 
-    # Rename temp to final
-    temp_path.rename(path)
+    # Atomic, crash-safe write
+    atomic_write(path, updated.encode('utf-8'))
+    _invalidate_env_cache(env_path)
 
     LOG.info(f"Saved .env config (backup at {backup_path})")
 
 
+def _invalidate_env_cache(env_path: str) -> None:
+    """Drop cached parse results for an .env path after it is rewritten."""
+    _read_env_file.cache_clear()
+    with _ENV_CACHE_LOCK:
+        _ENV_CACHE.pop(env_path, None)
+
+
+def _load_cached_env(env_path: str) -> _EnvCacheEntry:
+    """
+    Return parsed config for an .env file, re-reading only on change.
+
+    The cache entry is keyed by the file's st_mtime_ns, so edits made outside
+    the admin UI are still picked up on the next call.
+
+    Raises:
+        FileNotFoundError: If .env file doesn't exist
+    """
+    try:
+        mtime_ns = os.stat(env_path).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f".env file not found at {Path(env_path)}") from None
+
+    with _ENV_CACHE_LOCK:
+        entry = _ENV_CACHE.get(env_path)
+        if entry is None or entry.mtime_ns != mtime_ns:
+            config = load_env_config(env_path)
+            contacts = parse_contacts(config.get("CONTACTS", ""))
+            allowlist = parse_allowlist(config.get("ALLOWLIST", ""))
+            entry = _EnvCacheEntry(
+                mtime_ns=mtime_ns,
+                contacts=contacts,
+                numbers={number: name for name, number in contacts.items()},
+                allowlist=allowlist,
+                sorted_contacts=tuple(sorted(contacts.items())),
+                sorted_allowlist=tuple(sorted(allowlist)),
+            )
+            _ENV_CACHE[env_path] = entry
+    return entry
+
+
 def get_contacts_from_env(env_path: str = ".env") -> Dict[str, str]:
     """
     Load contacts from .env file.
@@ -259,11 +394,22 @@ def get_contacts_from_env(env_path: str = ".env") -> Dict[str, str]:
         env_path: Path to .env file
 
     Returns:
-        Dictionary of contact name → phone number
+        Dictionary of contact name → phone number (a copy, safe to mutate)
     """
-    config = load_env_config(env_path)
-    contacts_raw = config.get("CONTACTS", "")
-    return parse_contacts(contacts_raw)
+    return dict(_load_cached_env(env_path).contacts)
+
+
+def get_contact_numbers_from_env(env_path: str = ".env") -> Mapping[str, str]:
+    """
+    Load the reverse contact index (phone number → contact name) from .env file.
+
+    Args:
+        env_path: Path to .env file
+
+    Returns:
+        Read-only mapping of phone number → contact name
+    """
+    return MappingProxyType(_load_cached_env(env_path).numbers)
 
 
 def get_allowlist_from_env(env_path: str = ".env") -> Set[str]:
@@ -274,8 +420,24 @@ def get_allowlist_from_env(env_path: str = ".env") -> Set[str]:
         env_path: Path to .env file
 
     Returns:
-        Set of allowed phone numbers
+        Set of allowed phone numbers (a copy, safe to mutate)
+    """
+    return set(_load_cached_env(env_path).allowlist)
+
+
+def get_sorted_config_from_env(
+    env_path: str = ".env",
+) -> Tuple[Tuple[Tuple[str, str], ...], Tuple[str, ...]]:
+    """
+    Load contacts and allowlist from .env file, sorted for display.
+
+    Sorting happens once per .env change, not once per call.
+
+    Args:
+        env_path: Path to .env file
+
+    Returns:
+        Tuple of (sorted (name, number) pairs, sorted allowed numbers)
     """
-    config = load_env_config(env_path)
-    allowlist_raw = config.get("ALLOWLIST", "")
-    return parse_allowlist(allowlist_raw)
+    entry = _load_cached_env(env_path)
+    return entry.sorted_contacts, entry.sorted_allowlist
@@ -2,10 +2,28 @@
 """Discover Telegram chat IDs for contact mapping."""
 from __future__ import annotations
 
+import functools
 import os
-import requests
 from typing import Dict, List
 
+# getUpdates long-polls for up to 10s, so the read timeout must exceed it
+REQUEST_TIMEOUT = (5, 15)
+
+
+@functools.lru_cache(maxsize=1)
+def _session():
+    """
+    Shared session so repeated getUpdates calls reuse the TLS connection.
+
+    requests is imported here so a missing bot token fails without loading it.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return session
+
 
 def get_bot_token() -> str:
     """Get bot token from environment."""
@@ -19,7 +37,7 @@ def get_updates(bot_token: str, offset: int | None = None) -> List[Dict]:
     """Fetch updates from Telegram Bot API."""
     url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
     params = {'offset': offset, 'timeout': 10}
-    resp = requests.get(url, params=params)
+    resp = _session().get(url, params=params, timeout=REQUEST_TIMEOUT)
     resp.raise_for_status()
     return resp.json().get('result', [])
 
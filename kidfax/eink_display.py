@@ -2,11 +2,17 @@
 """Shared e-ink display utilities for Kid Fax."""
 from __future__ import annotations
 
+import functools
 import importlib
 import logging
 import os
-import textwrap
-from typing import Optional
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+# PIL is imported by init_display() on first use, so runs with the display
+# disabled never load it
+Image = ImageDraw = ImageFont = None
 
 LOG = logging.getLogger("kidfax.eink")
 
@@ -18,6 +24,170 @@ EINK_DRIVER_PACKAGE = os.getenv(
 )
 EINK_DRIVER_MODULE = os.getenv("EINK_DRIVER_MODULE", "epd2in9d")
 HEADER_TEXT = os.getenv("KIDFAX_HEADER", "Kid Fax")
+EINK_BOLD_FONT = os.getenv(
+    "EINK_BOLD_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+)
+
+
+class CoalescingRenderer:
+    """
+    Run e-ink renders on a background thread, keeping only the newest request.
+
+    Keystrokes arrive faster than the panel can refresh, so submit() replaces
+    any render still waiting instead of queueing it; the key handler never
+    blocks on the panel. run_now() renders synchronously (for screens that must
+    be shown in order) and drops any stale pending render first.
+
+    With idle_seconds and on_idle set, on_idle() runs once on the render thread
+    after that long without a render (e.g. to put the panel to sleep).
+    """
+
+    def __init__(
+        self,
+        idle_seconds: Optional[float] = None,
+        on_idle: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self._pending: Optional[Tuple[Callable[..., Any], tuple]] = None
+        self._cond = threading.Condition()
+        self._display_lock = threading.Lock()
+        self._idle_seconds = idle_seconds
+        self._on_idle = on_idle if idle_seconds else None
+        self._last_render: Optional[float] = None  # None: idle callback not due
+        self._thread = threading.Thread(target=self._run, name="kidfax-eink", daemon=True)
+        self._thread.start()
+
+    def submit(self, render: Callable[..., Any], *args: Any) -> None:
+        """Schedule a render, replacing any render that hasn't started yet."""
+        with self._cond:
+            self._pending = (render, args)
+            self._cond.notify()
+
+    def run_now(self, render: Callable[..., Any], *args: Any) -> None:
+        """Discard pending renders and render synchronously on this thread."""
+        with self._display_lock:
+            with self._cond:
+                self._pending = None
+            try:
+                render(*args)
+            finally:
+                self._mark_rendered()
+
+    def _mark_rendered(self) -> None:
+        """Restart the idle countdown (caller holds the display lock)."""
+        if self._on_idle is not None:
+            with self._cond:
+                self._last_render = time.monotonic()
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    if self._last_render is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._last_render + self._idle_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            # Take the pending render only while holding the display, so a
+            # concurrent run_now() can't be overwritten by a stale frame
+            with self._display_lock:
+                with self._cond:
+                    job, self._pending = self._pending, None
+                    idle_due = (
+                        job is None
+                        and self._last_render is not None
+                        and time.monotonic() - self._last_render >= self._idle_seconds
+                    )
+                    if idle_due:
+                        self._last_render = None
+                if job is not None:
+                    render, args = job
+                    try:
+                        render(*args)
+                    except Exception as exc:
+                        LOG.debug("Background e-ink render failed: %s", exc)
+                    self._mark_rendered()
+                elif idle_due:
+                    try:
+                        self._on_idle()
+                    except Exception as exc:
+                        LOG.debug("E-ink idle callback failed: %s", exc)
+
+
+# Whether the panel is powered up; renders that end in sleep() clear it, and
+# keyboard mode re-inits before drawing on a sleeping panel
+_panel_state = {"awake": False}
+
+
+def _sleep(epd) -> None:
+    """Put the panel into deep sleep and remember that it needs an init()."""
+    _panel_state["awake"] = False
+    epd.sleep()
+
+
+def _wake(epd) -> None:
+    """Re-init the panel if it was put to sleep."""
+    if not _panel_state["awake"]:
+        epd.init()
+        _panel_state["awake"] = True
+
+
+@functools.lru_cache(maxsize=1)
+def _default_font():
+    """Load PIL's default bitmap font once and reuse it for every frame."""
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=4)
+def _bold_font(size: int = 12):
+    """Load the bold TrueType font once; None if it isn't installed."""
+    try:
+        return ImageFont.truetype(EINK_BOLD_FONT, size)
+    except (OSError, ImportError) as exc:
+        LOG.debug("Bold font unavailable (%s), faking bold: %s", EINK_BOLD_FONT, exc)
+        return None
+
+
+def _draw_bold(draw, xy: Tuple[int, int], text: str) -> None:
+    """Draw text once in the bold font, or double-draw the default font without it."""
+    bold = _bold_font()
+    if bold is not None:
+        draw.text(xy, text, font=bold, fill=0)
+        return
+    font = _default_font()
+    x, y = xy
+    draw.text((x, y), text, font=font, fill=0)
+    draw.text((x + 1, y), text, font=font, fill=0)
+
+
+@functools.lru_cache(maxsize=2)
+def _blank_frame(width: int, height: int):
+    """White 1-bit frame for the panel size; callers draw on a .copy()."""
+    return Image.new('1', (width, height), 255)
+
+
+def _frame_bytes(epd, image) -> bytearray:
+    """
+    Pack a frame into the panel's 1bpp buffer layout.
+
+    A native-orientation 1-bit frame is already laid out the way the panel
+    expects (MSB first, 1 = white), so PIL's C packer produces the buffer
+    directly; some driver versions of getbuffer() walk pixels in Python.
+    Anything else (rotated or non-1-bit) falls back to the driver.
+    """
+    if image.mode == '1' and image.size == (epd.width, epd.height) and epd.width % 8 == 0:
+        return bytearray(image.tobytes())
+    return epd.getbuffer(image)
+
+
+def _load_pil() -> None:
+    """Import PIL into the module globals once; raises ImportError if missing."""
+    global Image, ImageDraw, ImageFont
+    if Image is None:
+        from PIL import Image, ImageDraw, ImageFont
 
 
 def _is_enabled() -> bool:
@@ -40,9 +210,14 @@ def init_display():
         return None
 
     try:
+        _load_pil()
         module = importlib.import_module(f"{EINK_DRIVER_PACKAGE}.{EINK_DRIVER_MODULE}")
         epd = module.EPD()
         epd.init()
+        # Start from a known white panel; renders then push whole white-backed
+        # frames with display() instead of clearing (a full refresh) each time
+        epd.Clear(0xFF)
+        _panel_state["awake"] = True
         LOG.info("E-ink display initialized (%s x %s)", epd.width, epd.height)
         return epd
     except Exception as exc:
@@ -71,13 +246,10 @@ def render_polling_status(
         return
 
     try:
-        from PIL import Image, ImageDraw, ImageFont
-
-        epd.Clear(0xFF)
         width, height = epd.width, epd.height
-        image = Image.new('1', (width, height), 255)
+        image = _blank_frame(width, height).copy()
         draw = ImageDraw.Draw(image)
-        font = ImageFont.load_default()
+        font = _default_font()
 
         # Header
         draw.text((10, 10), HEADER_TEXT, font=font, fill=0)
@@ -96,31 +268,32 @@ def render_polling_status(
         # Bottom accent line
         draw.rectangle((10, height - 20, width - 10, height - 18), fill=0)
 
-        epd.display(epd.getbuffer(image))
-        epd.sleep()
+        epd.display(_frame_bytes(epd, image))
+        _sleep(epd)
     except Exception as exc:
         LOG.debug("Failed to update e-ink display: %s", exc)
 
 
-def render_contact_list(epd, fkey_map: dict[str, str]) -> None:
+def render_contact_list(
+    epd,
+    fkey_map: dict[str, str] | Sequence[tuple[str, str]],
+) -> None:
     """
     Render contact selection screen showing F-key mappings.
 
     Args:
         epd: Initialized e-Paper display object
-        fkey_map: Dictionary mapping F-keys to contact names (e.g., {"F1": "grandma"})
+        fkey_map: Dictionary mapping F-keys to contact names (e.g., {"F1": "grandma"}),
+            or already-sorted (fkey, name) pairs such as MessageComposer.sorted_fkeys
     """
     if epd is None:
         return
 
     try:
-        from PIL import Image, ImageDraw, ImageFont
-
-        epd.Clear(0xFF)
         width, height = epd.width, epd.height
-        image = Image.new('1', (width, height), 255)
+        image = _blank_frame(width, height).copy()
         draw = ImageDraw.Draw(image)
-        font = ImageFont.load_default()
+        font = _default_font()
 
         # Header
         draw.text((10, 5), f"{HEADER_TEXT} - Reply Mode", font=font, fill=0)
@@ -128,7 +301,8 @@ def render_contact_list(epd, fkey_map: dict[str, str]) -> None:
 
         # Contact list (max 8 visible on 2.9" screen)
         y = 28
-        for i, (fkey, contact_name) in enumerate(sorted(fkey_map.items())[:8]):
+        items = sorted(fkey_map.items()) if isinstance(fkey_map, dict) else fkey_map
+        for fkey, contact_name in items[:8]:
             if y > height - 30:
                 break
             text = f"{fkey}  {contact_name.title()}"
@@ -138,12 +312,49 @@ def render_contact_list(epd, fkey_map: dict[str, str]) -> None:
         # Footer instruction
         draw.text((10, height - 15), "Press F-key to reply", font=font, fill=0)
 
-        epd.display(epd.getbuffer(image))
-        epd.sleep()
+        epd.display(_frame_bytes(epd, image))
+        _sleep(epd)
     except Exception as exc:
         LOG.debug("Failed to render contact list: %s", exc)
 
 
+# Last full keyboard-mode frame, reused for partial (dirty-region) updates
+_keyboard_frame: dict = {"image": None, "recipient": None}
+
+# Keyboard-mode layout (2.9" panel)
+_MESSAGE_TOP = 28
+_MESSAGE_LINE_HEIGHT = 12
+_MESSAGE_MAX_LINES = 4
+_MESSAGE_WRAP_WIDTH = 25
+
+
+def _partial_refresh(epd):
+    """Return the driver's partial-refresh method, or None if unsupported."""
+    for name in ("display_Partial", "DisplayPartial", "displayPartial"):
+        method = getattr(epd, name, None)
+        if method is not None:
+            return method
+    return None
+
+
+def _draw_message_region(draw, width: int, height: int, font, message: str, char_limit: int) -> None:
+    """Draw the message text and character counter (the per-keystroke regions)."""
+    y = _MESSAGE_TOP
+    # Hard wrap at a fixed column; only slice as much text as fits on the panel
+    visible = min(len(message), _MESSAGE_WRAP_WIDTH * _MESSAGE_MAX_LINES)
+    wrapped_lines = [
+        message[i:i + _MESSAGE_WRAP_WIDTH] for i in range(0, visible, _MESSAGE_WRAP_WIDTH)
+    ] or [""]
+    for line in wrapped_lines:
+        if y > height - 30:
+            break
+        draw.text((10, y), line, font=font, fill=0)
+        y += _MESSAGE_LINE_HEIGHT
+
+    char_count = f"[{len(message)}/{char_limit}]"
+    draw.text((10, height - 15), char_count, font=font, fill=0)
+
+
 def render_keyboard_mode(
     epd,
     recipient: str,
@@ -153,6 +364,10 @@ def render_keyboard_mode(
     """
     Render interactive keyboard mode showing recipient and typed message.
 
+    Does a full refresh; use render_keyboard_mode_partial for keystrokes.
+    The panel is left awake so partial updates can follow immediately; call
+    sleep_display once typing goes idle (the next frame re-inits it).
+
     Layout:
         To: Grandma
         ─────────────────────
@@ -172,42 +387,84 @@ def render_keyboard_mode(
         return
 
     try:
-        from PIL import Image, ImageDraw, ImageFont
-
-        epd.Clear(0xFF)
+        _wake(epd)
         width, height = epd.width, epd.height
-        image = Image.new('1', (width, height), 255)
+        image = _blank_frame(width, height).copy()
         draw = ImageDraw.Draw(image)
-        font = ImageFont.load_default()
+        font = _default_font()
 
-        # Recipient header (bold simulation with offset)
+        # Recipient header (bold)
         recipient_text = f"To: {recipient.title()}"
-        draw.text((10, 5), recipient_text, font=font, fill=0)
-        draw.text((11, 5), recipient_text, font=font, fill=0)  # Bold effect
+        _draw_bold(draw, (10, 5), recipient_text)
 
         # Separator line
         draw.line((10, 20, width - 10, 20), fill=0)
 
-        # Message text (wrapped, max ~25 chars per line on 2.9" screen)
-        y = 28
-        wrapped_lines = textwrap.wrap(message, width=25) if message else [""]
-        for line in wrapped_lines[:4]:  # Max 4 visible lines
-            if y > height - 30:
-                break
-            draw.text((10, y), line, font=font, fill=0)
-            y += 12
+        # Message text (wrapped, max ~25 chars per line on 2.9" screen) and counter
+        _draw_message_region(draw, width, height, font, message, char_limit)
 
-        # Footer: character count and send instruction
-        char_count = f"[{len(message)}/{char_limit}]"
-        draw.text((10, height - 15), char_count, font=font, fill=0)
+        # Footer: send instruction
         draw.text((width - 60, height - 15), "ENTER", font=font, fill=0)
 
-        epd.display(epd.getbuffer(image))
-        epd.sleep()
+        epd.display(_frame_bytes(epd, image))
+        _keyboard_frame["image"] = image
+        _keyboard_frame["recipient"] = recipient
     except Exception as exc:
+        _keyboard_frame["image"] = None
         LOG.debug("Failed to render keyboard mode: %s", exc)
 
 
+def render_keyboard_mode_partial(
+    epd,
+    recipient: str,
+    message: str,
+    char_limit: int = 160,
+) -> None:
+    """
+    Update only the message text and character counter after a keystroke.
+
+    Redraws the dirty regions on the last full frame and pushes it with the
+    driver's partial refresh (no Clear, no sleep). Falls back to a full
+    render_keyboard_mode if the recipient changed, there is no cached frame,
+    the panel is asleep, or the driver has no partial-refresh support.
+
+    Args:
+        epd: Initialized e-Paper display object
+        recipient: Contact name being messaged
+        message: Current message text
+        char_limit: SMS character limit (default 160)
+    """
+    if epd is None:
+        return
+
+    image = _keyboard_frame["image"]
+    partial = _partial_refresh(epd)
+    if (
+        image is None
+        or partial is None
+        or not _panel_state["awake"]
+        or _keyboard_frame["recipient"] != recipient
+    ):
+        render_keyboard_mode(epd, recipient, message, char_limit)
+        return
+
+    try:
+        width, height = epd.width, epd.height
+        draw = ImageDraw.Draw(image)
+        font = _default_font()
+
+        # Blank the message block and the counter (ENTER label stays untouched)
+        message_bottom = _MESSAGE_TOP + _MESSAGE_MAX_LINES * _MESSAGE_LINE_HEIGHT
+        draw.rectangle((10, _MESSAGE_TOP, width - 1, message_bottom), fill=255)
+        draw.rectangle((10, height - 15, width - 61, height - 1), fill=255)
+
+        _draw_message_region(draw, width, height, font, message, char_limit)
+
+        partial(_frame_bytes(epd, image))
+    except Exception as exc:
+        LOG.debug("Failed partial keyboard update: %s", exc)
+
+
 def render_send_confirmation(
     epd,
     recipient: str,
@@ -227,13 +484,10 @@ def render_send_confirmation(
         return
 
     try:
-        from PIL import Image, ImageDraw, ImageFont
-
-        epd.Clear(0xFF)
         width, height = epd.width, epd.height
-        image = Image.new('1', (width, height), 255)
+        image = _blank_frame(width, height).copy()
         draw = ImageDraw.Draw(image)
-        font = ImageFont.load_default()
+        font = _default_font()
 
         # Center-aligned status
         y_center = height // 2 - 20
@@ -246,8 +500,7 @@ def render_send_confirmation(
         else:  # Error
             symbol = "✗"
 
-        draw.text((width // 2 - 20, y_center), symbol, font=font, fill=0)
-        draw.text((width // 2 - 20 + 1, y_center), symbol, font=font, fill=0)  # Bold
+        _draw_bold(draw, (width // 2 - 20, y_center), symbol)
 
         # Status text
         draw.text((width // 2 - 30, y_center + 20), status, font=font, fill=0)
@@ -256,8 +509,8 @@ def render_send_confirmation(
         recipient_text = f"To: {recipient.title()}"
         draw.text((width // 2 - 40, y_center + 40), recipient_text, font=font, fill=0)
 
-        epd.display(epd.getbuffer(image))
-        epd.sleep()
+        epd.display(_frame_bytes(epd, image))
+        _sleep(epd)
     except Exception as exc:
         LOG.debug("Failed to render send confirmation: %s", exc)
 
@@ -274,6 +527,22 @@ def clear_display(epd) -> None:
 
     try:
         epd.Clear(0xFF)
-        epd.sleep()
+        _sleep(epd)
     except Exception as exc:
         LOG.debug("Failed to clear display: %s", exc)
+
+
+def sleep_display(epd) -> None:
+    """
+    Put an awake panel to sleep (e.g. after keyboard mode goes idle).
+
+    Args:
+        epd: Initialized e-Paper display object
+    """
+    if epd is None or not _panel_state["awake"]:
+        return
+
+    try:
+        _sleep(epd)
+    except Exception as exc:
+        LOG.debug("Failed to put display to sleep: %s", exc)
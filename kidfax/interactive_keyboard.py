@@ -2,20 +2,21 @@
 """Interactive keyboard messaging for Kid Fax."""
 from __future__ import annotations
 
+import functools
 import logging
 import os
 import sys
 import time
 from typing import Optional
 
-from pynput import keyboard
-from twilio.rest import Client
-
 from kidfax.eink_display import (
+    CoalescingRenderer,
     init_display,
     render_contact_list,
     render_keyboard_mode,
+    render_keyboard_mode_partial,
     render_send_confirmation,
+    sleep_display,
 )
 from kidfax.keyboard_input import (
     MessageComposer,
@@ -28,6 +29,8 @@ LOG = logging.getLogger("kidfax.interactive")
 # Configuration
 SMS_CHAR_LIMIT = int(os.getenv("SMS_CHAR_LIMIT", "160"))
 PRINT_RECEIPTS = os.getenv("PRINT_SEND_RECEIPTS", "false").lower() in {"1", "true", "yes"}
+# Keystroke frames leave the panel awake; sleep it after this long without typing
+EINK_IDLE_SLEEP_SECONDS = 30
 
 
 def _required_env(name: str) -> str:
@@ -51,6 +54,8 @@ def send_sms(recipient_name: str, recipient_number: str, message_text: str) -> b
         True if sent successfully, False otherwise
     """
     try:
+        from twilio.rest import Client
+
         account_sid = _required_env("TWILIO_ACCOUNT_SID")
         auth_token = _required_env("TWILIO_AUTH_TOKEN")
         from_number = _required_env("TWILIO_NUMBER")
@@ -174,6 +179,8 @@ def interactive_loop() -> None:
         print("Example: CONTACTS=grandma:+15551112222,uncle:+15553334444")
         sys.exit(1)
 
+    from pynput import keyboard
+
     # Initialize e-ink display
     epd = init_display()
     if epd is None:
@@ -182,19 +189,104 @@ def interactive_loop() -> None:
     # Initialize message composer
     composer = MessageComposer(contacts, char_limit=SMS_CHAR_LIMIT)
 
+    # Display updates run on a background thread so typing never waits on the panel.
+    # Held-key autorepeat (e.g. backspace at ~30 Hz) only updates the composer per
+    # event; submit() keeps just the newest frame, so renders are batched to
+    # whatever rate the panel can refresh at. Once typing stops the panel is put
+    # to sleep; the next frame re-inits it
+    renderer = CoalescingRenderer(
+        idle_seconds=EINK_IDLE_SLEEP_SECONDS,
+        on_idle=functools.partial(sleep_display, epd) if epd is not None else None,
+    )
+
     # Show initial contact list
-    render_contact_list(epd, composer.fkey_map)
+    renderer.run_now(render_contact_list, epd, composer.sorted_fkeys)
+
+    def handle_esc():
+        """ESC: Exit application."""
+        LOG.info("ESC pressed, exiting interactive mode")
+        renderer.run_now(render_contact_list, epd, composer.sorted_fkeys)
+        print("\nExiting Kid Fax interactive keyboard mode...")
+        return False  # Stop listener
+
+    def handle_enter():
+        """Enter: Send message."""
+        if not composer.is_ready_to_send():
+            if not composer.selected_recipient:
+                print("\n✗ No recipient selected. Press F1-F12 to select a contact.")
+            elif not composer.message_buffer:
+                print("\n✗ Message is empty. Type a message first.")
+            return
+
+        recipient_name = composer.selected_recipient
+        recipient_number = composer.selected_number
+        message_text = composer.get_message()
+
+        print(f"\n→ Sending to {recipient_name}...")
+
+        # Show "Sending..." on e-ink
+        renderer.run_now(render_send_confirmation, epd, recipient_name, "Sending...")
+
+        # Send via Twilio
+        success = send_sms(recipient_name, recipient_number, message_text)
+
+        if success:
+            print(f"✓ Message sent to {recipient_name}!")
+
+            # Show "Sent!" confirmation
+            renderer.run_now(render_send_confirmation, epd, recipient_name, "Sent!")
+
+            # Optional: Print receipt
+            print_send_receipt(recipient_name, message_text)
+
+            # Wait 2 seconds for user to see confirmation
+            time.sleep(2)
+        else:
+            print(f"✗ Failed to send message to {recipient_name}")
+            renderer.run_now(render_send_confirmation, epd, recipient_name, "Error!")
+            time.sleep(2)
+
+        # Reset and return to contact list
+        composer.reset()
+        renderer.run_now(render_contact_list, epd, composer.sorted_fkeys)
+        print("\n" + "="*50)
+        print("Kid Fax - Reply Mode")
+        print("="*50)
+        print("Press F1-F12 to select a recipient:")
+        print(composer.menu_text)
+        print("\nPress ESC to exit")
+        print("="*50)
+
+    def handle_backspace():
+        """Backspace: Delete character."""
+        if composer.selected_recipient:
+            if composer.delete_character():
+                # Update display (message/counter region only)
+                renderer.submit(
+                    render_keyboard_mode_partial,
+                    epd,
+                    composer.selected_recipient,
+                    composer.get_message(),
+                    SMS_CHAR_LIMIT
+                )
+                # Visual feedback
+                sys.stdout.write('\b \b')
+                sys.stdout.flush()
+
+    # Special keys dispatch through a table so typed characters skip the checks
+    key_handlers = {
+        keyboard.Key.esc: handle_esc,
+        keyboard.Key.enter: handle_enter,
+        keyboard.Key.backspace: handle_backspace,
+    }
 
     # Keyboard event handler
     def on_key_press(key):
         """Handle keyboard events."""
         try:
-            # ESC: Exit application
-            if key == keyboard.Key.esc:
-                LOG.info("ESC pressed, exiting interactive mode")
-                render_contact_list(epd, composer.fkey_map)
-                print("\nExiting Kid Fax interactive keyboard mode...")
-                return False  # Stop listener
+            handler = key_handlers.get(key)
+            if handler is not None:
+                return handler()
 
             # Function key: Select recipient
             fkey_name = is_function_key(key)
@@ -202,7 +294,8 @@ def interactive_loop() -> None:
                 if composer.select_recipient_by_fkey(fkey_name):
                     print(f"\n→ Selected: {composer.selected_recipient}")
                     print(f"Type your message (max {SMS_CHAR_LIMIT} chars), then press Enter to send:")
-                    render_keyboard_mode(
+                    renderer.submit(
+                        render_keyboard_mode,
                         epd,
                         composer.selected_recipient,
                         composer.get_message(),
@@ -212,73 +305,6 @@ def interactive_loop() -> None:
                     print(f"\n✗ No contact mapped to {fkey_name}")
                 return
 
-            # Enter: Send message
-            if key == keyboard.Key.enter:
-                if not composer.is_ready_to_send():
-                    if not composer.selected_recipient:
-                        print("\n✗ No recipient selected. Press F1-F12 to select a contact.")
-                    elif not composer.message_buffer:
-                        print("\n✗ Message is empty. Type a message first.")
-                    return
-
-                recipient_name = composer.selected_recipient
-                recipient_number = composer.selected_number
-                message_text = composer.get_message()
-
-                print(f"\n→ Sending to {recipient_name}...")
-
-                # Show "Sending..." on e-ink
-                render_send_confirmation(epd, recipient_name, "Sending...")
-
-                # Send via Twilio
-                success = send_sms(recipient_name, recipient_number, message_text)
-
-                if success:
-                    print(f"✓ Message sent to {recipient_name}!")
-
-                    # Show "Sent!" confirmation
-                    render_send_confirmation(epd, recipient_name, "Sent!")
-
-                    # Optional: Print receipt
-                    print_send_receipt(recipient_name, message_text)
-
-                    # Wait 2 seconds for user to see confirmation
-                    time.sleep(2)
-                else:
-                    print(f"✗ Failed to send message to {recipient_name}")
-                    render_send_confirmation(epd, recipient_name, "Error!")
-                    time.sleep(2)
-
-                # Reset and return to contact list
-                composer.reset()
-                render_contact_list(epd, composer.fkey_map)
-                print("\n" + "="*50)
-                print("Kid Fax - Reply Mode")
-                print("="*50)
-                print("Press F1-F12 to select a recipient:")
-                for fkey, name in sorted(composer.fkey_map.items()):
-                    print(f"  {fkey}: {name.title()}")
-                print("\nPress ESC to exit")
-                print("="*50)
-
-                return
-
-            # Backspace: Delete character
-            if key == keyboard.Key.backspace:
-                if composer.selected_recipient:
-                    if composer.delete_character():
-                        # Update display
-                        render_keyboard_mode(
-                            epd,
-                            composer.selected_recipient,
-                            composer.get_message(),
-                            SMS_CHAR_LIMIT
-                        )
-                        # Visual feedback
-                        sys.stdout.write('\b \b')
-                        sys.stdout.flush()
-                return
-
             # Regular character: Add to message
             if hasattr(key, 'char') and key.char:
                 if not composer.selected_recipient:
@@ -286,8 +312,9 @@ def interactive_loop() -> None:
                     return
 
                 if composer.add_character(key.char):
-                    # Update display
-                    render_keyboard_mode(
+                    # Update display (message/counter region only)
+                    renderer.submit(
+                        render_keyboard_mode_partial,
                         epd,
                         composer.selected_recipient,
                         composer.get_message(),
@@ -308,8 +335,7 @@ def interactive_loop() -> None:
     print("Kid Fax - Interactive Keyboard Mode")
     print("="*50)
     print("Press F1-F12 to select a recipient:")
-    for fkey, name in sorted(composer.fkey_map.items()):
-        print(f"  {fkey}: {name.title()}")
+    print(composer.menu_text)
     print("\nPress ESC to exit")
     print("="*50)
 
@@ -2,37 +2,16 @@
 """Keyboard input handling for Kid Fax interactive messaging."""
 from __future__ import annotations
 
+import functools
+import heapq
 import logging
 import os
-from typing import Dict, Optional
+from itertools import islice
+from typing import Dict, Optional, Tuple
 
-LOG = logging.getLogger("kidfax.keyboard")
-
-
-def _parse_contacts(raw: str) -> Dict[str, str]:
-    """
-    Parse CONTACTS environment variable into name→number mapping.
-
-    Args:
-        raw: Comma-separated contacts in format "name:+15551234567,..."
+from kidfax.config_manager import parse_contacts
 
-    Returns:
-        Dictionary mapping contact names to phone numbers
-
-    Example:
-        >>> _parse_contacts("grandma:+15551112222,uncle:+15553334444")
-        {'grandma': '+15551112222', 'uncle': '+15553334444'}
-    """
-    contacts: Dict[str, str] = {}
-    for chunk in raw.split(','):
-        if ':' not in chunk:
-            continue
-        name, number = chunk.split(':', 1)
-        name = name.strip()
-        number = number.strip()
-        if name and number:
-            contacts[name] = number
-    return contacts
+LOG = logging.getLogger("kidfax.keyboard")
 
 
 def load_contacts(limit: int = 12) -> Dict[str, str]:
@@ -55,7 +34,7 @@ def load_contacts(limit: int = 12) -> Dict[str, str]:
             "Example: CONTACTS=grandma:+15551112222,uncle:+15553334444"
         )
 
-    contacts = _parse_contacts(raw)
+    contacts = parse_contacts(raw)
     if not contacts:
         raise RuntimeError(
             f"No valid contacts parsed from CONTACTS={raw}. "
@@ -63,7 +42,7 @@ def load_contacts(limit: int = 12) -> Dict[str, str]:
         )
 
     # Limit to first N contacts (F1-F12 constraint)
-    limited = dict(list(contacts.items())[:limit])
+    limited = dict(islice(contacts.items(), limit))
 
     LOG.info("Loaded %d contacts (limit=%d): %s",
              len(limited), limit, ", ".join(limited.keys()))
@@ -87,7 +66,7 @@ def map_fkeys_to_contacts(contacts: Dict[str, str]) -> Dict[str, str]:
         If more than 12 contacts provided, only first 12 are mapped.
     """
     fkey_map: Dict[str, str] = {}
-    contact_names = sorted(contacts.keys())[:12]  # Max 12 for F1-F12
+    contact_names = heapq.nsmallest(12, contacts)  # Max 12 for F1-F12 (sorted)
 
     for i, contact_name in enumerate(contact_names, start=1):
         fkey = f"F{i}"
@@ -151,34 +130,28 @@ def is_function_key(key) -> Optional[str]:
         None
     """
     try:
-        # pynput represents function keys as keyboard.Key.f1, f2, etc.
-        from pynput import keyboard
-
-        if key in [
-            keyboard.Key.f1,
-            keyboard.Key.f2,
-            keyboard.Key.f3,
-            keyboard.Key.f4,
-            keyboard.Key.f5,
-            keyboard.Key.f6,
-            keyboard.Key.f7,
-            keyboard.Key.f8,
-            keyboard.Key.f9,
-            keyboard.Key.f10,
-            keyboard.Key.f11,
-            keyboard.Key.f12,
-        ]:
-            # Extract F-key number from key name
-            # keyboard.Key.f1.name → "f1" → "F1"
-            return key.name.upper()
-
-        return None
-
+        return _function_key_names().get(key)
     except Exception as exc:
         LOG.debug("Error checking function key: %s", exc)
         return None
 
 
+@functools.lru_cache(maxsize=1)
+def _function_key_names() -> Dict[object, str]:
+    """
+    Build the F1-F12 lookup table once; every key event is then a dict hit.
+
+    pynput represents function keys as keyboard.Key.f1, f2, etc.; the table
+    maps each one to its display name (keyboard.Key.f1.name → "f1" → "F1").
+    """
+    from pynput import keyboard
+
+    return {
+        getattr(keyboard.Key, f"f{i}"): f"F{i}"
+        for i in range(1, 13)
+    }
+
+
 class MessageComposer:
     """
     Interactive message composer with keyboard input.
@@ -203,10 +176,15 @@ class MessageComposer:
         self.fkey_map = map_fkeys_to_contacts(contacts)
         self.char_limit = char_limit
 
+        # Fixed for the composer's lifetime, so sort and format the menu once
+        self.sorted_fkeys: Tuple[Tuple[str, str], ...] = tuple(sorted(self.fkey_map.items()))
+        self.menu_text = "\n".join(f"  {fkey}: {name.title()}" for fkey, name in self.sorted_fkeys)
+
         # State
         self.selected_recipient: Optional[str] = None
         self.selected_number: Optional[str] = None
-        self.message_buffer: list[str] = []
+        # Kept as a str (≤ char_limit) so get_message() needs no join per render
+        self.message_buffer: str = ""
 
         LOG.info("MessageComposer initialized with %d contacts", len(contacts))
 
@@ -223,7 +201,7 @@ class MessageComposer:
         result = get_contact_from_fkey(fkey_name, self.fkey_map, self.contacts)
         if result:
             self.selected_recipient, self.selected_number = result
-            self.message_buffer = []  # Clear message buffer
+            self.message_buffer = ""  # Clear message buffer
             LOG.info("Selected recipient: %s (%s)",
                      self.selected_recipient, self.selected_number)
             return True
@@ -243,7 +221,7 @@ class MessageComposer:
             LOG.debug("Character limit reached (%d)", self.char_limit)
             return False
 
-        self.message_buffer.append(char)
+        self.message_buffer += char
         return True
 
     def delete_character(self) -> bool:
@@ -254,23 +232,23 @@ class MessageComposer:
             True if character deleted, False if buffer empty
         """
         if self.message_buffer:
-            self.message_buffer.pop()
+            self.message_buffer = self.message_buffer[:-1]
             return True
         return False
 
     def get_message(self) -> str:
         """Get current message text."""
-        return ''.join(self.message_buffer)
+        return self.message_buffer
 
     def clear_message(self) -> None:
         """Clear message buffer."""
-        self.message_buffer = []
+        self.message_buffer = ""
 
     def reset(self) -> None:
         """Reset composer state (clear recipient and message)."""
         self.selected_recipient = None
         self.selected_number = None
-        self.message_buffer = []
+        self.message_buffer = ""
         LOG.debug("Composer reset")
 
     def is_ready_to_send(self) -> bool:
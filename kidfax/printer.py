@@ -3,14 +3,20 @@ from __future__ import annotations
 
 import logging
 import os
+import struct
+from datetime import datetime
 from typing import Optional
 
-from escpos.printer import Network, Serial, Usb
-
-__all__ = ["DummyPrinter", "get_printer", "print_ticket"]
+__all__ = ["DummyPrinter", "encodes_ascii", "get_printer", "print_packed_image", "print_ticket"]
 
 LOGGER = logging.getLogger(__name__)
 
+TICKET_TIME_FORMAT = "%I:%M %p"
+TICKET_WIDTH = 32
+SEPARATOR_LINE = "-" * TICKET_WIDTH + "\n"
+HEAVY_LINE = "=" * TICKET_WIDTH + "\n"
+TICKET_DATE_FORMAT = "%B %d, %Y"
+
 
 class DummyPrinter:
     """Minimal stand-in printer that writes output to stdout."""
@@ -31,7 +37,7 @@ class DummyPrinter:
         self.text("\n")
 
     def cut(self) -> None:
-        self.text("\n" + "-" * 32 + "\n")
+        self.text("\n" + SEPARATOR_LINE)
 
 
 def _coerce_int(value: Optional[str], default: Optional[int] = None) -> Optional[int]:
@@ -51,7 +57,12 @@ def _printer_backend() -> str:
 
 
 def get_printer(*, allow_dummy: bool = False) -> Optional[object]:
-    """Return an ESC/POS printer instance based on env configuration."""
+    """
+    Return an ESC/POS printer instance based on env configuration.
+
+    python-escpos is imported only for the selected driver, so the dummy
+    backend (and modules that merely import this one) never load it.
+    """
 
     driver = _printer_backend()
 
@@ -78,6 +89,8 @@ def get_printer(*, allow_dummy: bool = False) -> Optional[object]:
                 hex(vendor) if vendor is not None else "?",
                 hex(product) if product is not None else "?",
             )
+            from escpos.printer import Usb
+
             return Usb(vendor, product, **kwargs)
 
         if driver in {"serial", "bluetooth"}:
@@ -90,12 +103,16 @@ def get_printer(*, allow_dummy: bool = False) -> Optional[object]:
             )
             timeout = float(os.getenv("SERIAL_TIMEOUT", "1"))
             LOGGER.info("Connecting to serial printer on %s @ %sbps", port, baud)
+            from escpos.printer import Serial
+
             return Serial(devfile=port, baudrate=baud, timeout=timeout)
 
         if driver == "network":
             host = os.getenv("NETWORK_HOST", "192.168.1.100")
             port = _coerce_int(os.getenv("NETWORK_PORT"), 9100)
             LOGGER.info("Connecting to network printer %s:%s", host, port)
+            from escpos.printer import Network
+
             return Network(host, port)
 
         raise ValueError(f"Unknown printer driver '{driver}'")
@@ -108,44 +125,62 @@ def get_printer(*, allow_dummy: bool = False) -> Optional[object]:
         return None
 
 
+def encodes_ascii(encoding: str) -> bool:
+    """True if every ASCII character round-trips through the printer encoding."""
+    ascii_chars = "".join(map(chr, range(128)))
+    try:
+        return ascii_chars.encode(encoding).decode(encoding) == ascii_chars
+    except (LookupError, UnicodeError):
+        return False
+
+
+def print_packed_image(printer: object, packed: bytes) -> bool:
+    """
+    Send a pre-packed 1-bit raster (avatar_manager.get_avatar_packed) to the printer.
+
+    Emits the same GS v 0 raster command escpos uses for ``printer.image()``,
+    without decoding or re-packing the image. Returns False if the printer
+    doesn't accept raw ESC/POS (e.g. DummyPrinter) so callers can fall back.
+    """
+    raw = getattr(printer, "_raw", None)
+    if raw is None:
+        return False
+
+    width, height = struct.unpack_from("<HH", packed)
+    width_bytes = (width + 7) // 8
+    raw(b"\x1dv0\x00" + struct.pack("<HH", width_bytes, height) + packed[4:])
+    return True
+
+
 def print_ticket(printer: object, from_name: str, question: str) -> bool:
     """Print the original ticket template used by the web UI."""
 
-    from datetime import datetime
-
     try:
         now = datetime.now()
-        time_str = now.strftime("%I:%M %p")
-        date_str = now.strftime("%B %d, %Y")
+        time_str = now.strftime(TICKET_TIME_FORMAT)
+        date_str = now.strftime(TICKET_DATE_FORMAT)
 
+        # Consecutive same-style lines are sent in one write
         printer.set(align="center", font="a", width=2, height=2, bold=True)
-        printer.text("================================\n")
-        printer.text("TICKET\n")
+        printer.text(HEAVY_LINE + "TICKET\n")
 
         printer.set(align="center", font="a", width=1, height=1, bold=False)
-        printer.text("--------------------------------\n")
+        printer.text(SEPARATOR_LINE)
 
         printer.set(align="left", font="a", width=1, height=1, bold=True)
         printer.text(f"From: {from_name}\n")
 
         printer.set(align="left", font="a", width=1, height=1, bold=False)
-        printer.text(f"Time: {time_str}\n")
-        printer.text(f"Date: {date_str}\n")
-
-        printer.text("--------------------------------\n")
+        printer.text(f"Time: {time_str}\nDate: {date_str}\n{SEPARATOR_LINE}")
 
         printer.set(align="left", font="a", width=1, height=1, bold=True)
         printer.text("Question/Comment\n")
 
         printer.set(align="left", font="a", width=1, height=1, bold=False)
-        printer.text(f"{question}\n")
-
-        printer.text("--------------------------------\n")
+        printer.text(f"{question}\n{SEPARATOR_LINE}")
 
         printer.set(align="center", font="a", width=2, height=2, bold=True)
-        printer.text("================================\n")
-
-        printer.text("\n\n")
+        printer.text(HEAVY_LINE + "\n\n")
         printer.cut()
         return True
     except Exception as exc:  # pragma: no cover - hardware interaction
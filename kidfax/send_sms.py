@@ -6,7 +6,7 @@ import os
 import sys
 from typing import Dict
 
-from twilio.rest import Client
+from kidfax.config_manager import parse_contacts
 
 
 def _required_env(name: str) -> str:
@@ -16,19 +16,6 @@ def _required_env(name: str) -> str:
     return value
 
 
-def _parse_contacts(raw: str) -> Dict[str, str]:
-    contacts: Dict[str, str] = {}
-    for chunk in raw.split(','):
-        if ':' not in chunk:
-            continue
-        name, number = chunk.split(':', 1)
-        name = name.strip()
-        number = number.strip()
-        if name and number:
-            contacts[name] = number
-    return contacts
-
-
 def _resolve_recipient(value: str, contacts: Dict[str, str]) -> str:
     if value in contacts:
         return contacts[value]
@@ -47,13 +34,16 @@ def main(argv: list[str] | None = None) -> int:
         print("Message body cannot be empty.")
         return 1
 
-    contacts = _parse_contacts(os.getenv("CONTACTS", ""))
+    contacts = parse_contacts(os.getenv("CONTACTS", ""))
     to_number = _resolve_recipient(recipient_key, contacts)
 
     account_sid = _required_env("TWILIO_ACCOUNT_SID")
     auth_token = _required_env("TWILIO_AUTH_TOKEN")
     from_number = _required_env("TWILIO_NUMBER")
 
+    # Imported after argument checks so usage errors don't pay for twilio
+    from twilio.rest import Client
+
     client = Client(account_sid, auth_token)
     message = client.messages.create(to=to_number, from_=from_number, body=body)
     print(f"Sent message {message.sid} to {to_number}")
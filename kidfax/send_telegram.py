@@ -2,11 +2,13 @@
 """Send a Telegram message from the Kid Fax setup."""
 from __future__ import annotations
 
+import functools
 import os
 import sys
-import requests
 from typing import Dict
 
+from kidfax.config_manager import parse_chat_contacts
+
 
 def _required_env(name: str) -> str:
     """Get required environment variable."""
@@ -16,23 +18,6 @@ def _required_env(name: str) -> str:
     return value
 
 
-def _parse_contacts(raw: str) -> Dict[str, int]:
-    """Parse CONTACTS env var into name->chat_id mapping."""
-    contacts: Dict[str, int] = {}
-    for chunk in raw.split(','):
-        if ':' not in chunk:
-            continue
-        name, chat_id = chunk.split(':', 1)
-        name = name.strip()
-        chat_id = chat_id.strip()
-        if name and chat_id:
-            try:
-                contacts[name] = int(chat_id)
-            except ValueError:
-                continue
-    return contacts
-
-
 def _resolve_recipient(value: str, contacts: Dict[str, int]) -> int:
     """Resolve contact name or direct chat ID to chat ID."""
     if value in contacts:
@@ -43,6 +28,18 @@ def _resolve_recipient(value: str, contacts: Dict[str, int]) -> int:
         raise ValueError(f"Unknown contact '{value}' and not a valid chat ID")
 
 
+@functools.lru_cache(maxsize=1)
+def _session():
+    """Shared session so repeated sends reuse the TLS connection to Telegram."""
+    # Imported on first send so usage errors don't pay for requests
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return session
+
+
 def send_message(bot_token: str, chat_id: int, text: str) -> bool:
     """Send text message via Telegram Bot API."""
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
@@ -51,7 +48,7 @@ def send_message(bot_token: str, chat_id: int, text: str) -> bool:
         'text': text
     }
     try:
-        resp = requests.post(url, json=payload, timeout=10)
+        resp = _session().post(url, json=payload, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         if data.get('ok'):
@@ -82,7 +79,7 @@ def main(argv: list[str] | None = None) -> int:
         print("Message body cannot be empty.")
         return 1
 
-    contacts = _parse_contacts(os.getenv("CONTACTS", ""))
+    contacts = parse_chat_contacts(os.getenv("CONTACTS", ""))
 
     try:
         chat_id = _resolve_recipient(recipient_key, contacts)
@@ -3,26 +3,30 @@
 from __future__ import annotations
 
 import datetime as dt
-import json
 import logging
 import os
 import textwrap
 import time
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from types import MappingProxyType
+from typing import Container, Dict, List, Mapping, Optional, Tuple
 
 from PIL import Image
 from twilio.rest import Client
 
-from kidfax.avatar_manager import ensure_avatar_dir, get_avatar_path
-from kidfax.eink_display import init_display, render_polling_status
-from kidfax.printer import get_printer
+from kidfax.avatar_manager import ensure_avatar_dir, get_avatar_packed, get_avatar_path
+from kidfax.config_manager import parse_contacts
+from kidfax.eink_display import CoalescingRenderer, init_display, render_polling_status
+from kidfax.printer import encodes_ascii, get_printer, print_packed_image
+from kidfax.state_store import SeenStore
 
 LOG = logging.getLogger("kidfax.sms")
 
 DEFAULT_STATE_FILE = Path.home() / ".kidfax_state.json"
 ENCODING = os.getenv("PRINTER_ENCODING", "cp437")
 LINE_WIDTH = int(os.getenv("PRINTER_LINE_WIDTH", "32"))
+# Word-boundary wrapping; set false for cheaper fixed-column slicing
+SMART_WRAP = os.getenv("PRINTER_SMART_WRAP", "true").lower() in {"1", "true", "yes"}
 ALLOW_DUMMY = os.getenv("ALLOW_DUMMY_PRINTER", "false").lower() in {"1", "true", "yes"}
 
 
@@ -33,20 +37,8 @@ def _required_env(name: str) -> str:
     return value
 
 
-def _parse_contact_map(raw: str) -> Dict[str, str]:
-    contacts: Dict[str, str] = {}
-    for chunk in raw.split(','):
-        if ':' not in chunk:
-            continue
-        name, number = chunk.split(':', 1)
-        name = name.strip()
-        number = number.strip()
-        if name and number:
-            contacts[name] = number
-    return contacts
-
-
-CONTACTS = _parse_contact_map(os.getenv("CONTACTS", ""))
+# Environment is read once at import; the poller never re-reads it per message
+CONTACTS: Mapping[str, str] = MappingProxyType(parse_contacts(os.getenv("CONTACTS", "")))
 ALLOWLIST = {item.strip() for item in os.getenv("ALLOWLIST", "").split(',') if item.strip()}
 STATE_FILE = Path(os.getenv("KIDFAX_STATE_FILE", DEFAULT_STATE_FILE))
 MAX_STATE = int(os.getenv("KIDFAX_STATE_LIMIT", "5000"))
@@ -54,99 +46,139 @@ FETCH_LIMIT = int(os.getenv("TWILIO_FETCH_LIMIT", "40"))
 POLL_SECONDS = int(os.getenv("POLL_SECONDS", "15"))
 HEADER_TEXT = os.getenv("KIDFAX_HEADER", "Kid Fax")
 SUBTITLE_TEXT = os.getenv("KIDFAX_SUBTITLE", "Messages from family")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+SEPARATOR_LINE = "-" * LINE_WIDTH + "\n"
+CUT_FALLBACK_FEED = "\n\n\n"  # paper feed when the printer can't cut
+AVATAR_ENABLED = os.getenv("AVATAR_ENABLED", "true").lower() in {"1", "true", "yes"}
+# Print all messages from one poll on a single ticket (one cut)
+BATCH_PRINT = os.getenv("KIDFAX_BATCH_PRINT", "false").lower() in {"1", "true", "yes"}
+
+
+def _build_number_index(contacts: Mapping[str, str]) -> Dict[str, str]:
+    """Map number → name; the first contact listed wins if numbers repeat."""
+    index: Dict[str, str] = {}
+    for name, number in contacts.items():
+        index.setdefault(number, name)
+    return index
+
+
+_NUMBER_TO_NAME: Mapping[str, str] = MappingProxyType(_build_number_index(CONTACTS))
 
 
 def _contact_label(number: str) -> str:
-    for name, stored in CONTACTS.items():
-        if stored == number:
-            return f"{name} ({number})"
-    return number
+    name = _NUMBER_TO_NAME.get(number)
+    return f"{name} ({number})" if name else number
 
 
 def _extract_contact_name(number: str) -> Optional[str]:
     """Extract contact name from phone number."""
-    for name, stored in CONTACTS.items():
-        if stored == number:
-            return name
-    return None
+    return _NUMBER_TO_NAME.get(number)
+
+
+# Built once; textwrap.wrap() would construct a new TextWrapper per paragraph
+_WRAPPER = textwrap.TextWrapper(width=LINE_WIDTH)
 
 
 def _wrap_text(value: str) -> List[str]:
     lines: List[str] = []
     for para in value.splitlines() or [""]:
-        wrapped = textwrap.wrap(para, width=LINE_WIDTH) or [""]
-        lines.extend(wrapped)
+        if len(para) <= LINE_WIDTH and para.isprintable():
+            # Fits on one printer line; nothing for the wrapper to do
+            lines.append(para)
+        elif SMART_WRAP:
+            lines.extend(_WRAPPER.wrap(para) or [""])
+        else:
+            # Fixed-column hard wrap (breaks mid-word, but no tokenizing)
+            lines.extend(para[i:i + LINE_WIDTH] for i in range(0, len(para) or 1, LINE_WIDTH))
     return lines
 
 
-def _sanitize(value: str) -> str:
-    return value.encode(ENCODING, "ignore").decode(ENCODING)
-
-
-def _load_state() -> tuple[List[str], Set[str]]:
-    if not STATE_FILE.exists():
-        return [], set()
-    try:
-        data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
-        order = data.get("seen_sids", [])
-        return list(order), set(order)
-    except Exception as exc:
-        LOG.warning("Could not read state file (%s), starting fresh", exc)
-        return [], set()
+# Most SMS bodies are plain ASCII; skip the encode/decode round-trip for them
+_ASCII_SAFE = encodes_ascii(ENCODING)
 
 
-def _save_state(order: List[str]) -> None:
-    payload = {"seen_sids": order[-MAX_STATE:]}
-    STATE_FILE.write_text(json.dumps(payload), encoding="utf-8")
+def _sanitize(value: str) -> str:
+    if _ASCII_SAFE and value.isascii():
+        return value
+    return value.encode(ENCODING, "ignore").decode(ENCODING)
 
 
-def _print_message(printer: object, sender: str, body: str) -> None:
-    """Print SMS receipt with optional avatar."""
-    # 1. Header
-    now = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
+def _print_header(printer: object) -> None:
+    """Print the ticket header (title, timestamp, separator)."""
+    now = dt.datetime.now().strftime(TIMESTAMP_FORMAT)
     printer.set(align='center', font='a', width=2, height=2, bold=True)
     printer.text(f"{HEADER_TEXT}\n")
 
+    # Consecutive same-style text goes out in one write (one USB/serial transfer)
     printer.set(align='center', font='a', width=1, height=1, bold=False)
-    printer.text(f"{now}\n")
-    printer.text("-" * LINE_WIDTH + "\n")
+    printer.text(f"{now}\n{SEPARATOR_LINE}")
 
-    # 2. Avatar (if enabled and exists)
-    avatar_enabled = os.getenv("AVATAR_ENABLED", "true").lower() in {"1", "true", "yes"}
-    if avatar_enabled:
+
+def _print_section(printer: object, sender: str, body: str) -> None:
+    """Print one message: optional avatar, sender and wrapped body."""
+    # Avatar (if enabled and exists)
+    if AVATAR_ENABLED:
         contact_name = _extract_contact_name(sender)
         if contact_name:
             avatar_path = get_avatar_path(contact_name)
             if avatar_path and avatar_path.exists():
                 try:
-                    img = Image.open(avatar_path)
                     printer.set(align='center')
                     printer.text("\n")  # spacing before avatar
-                    printer.image(img)
+                    # Pre-packed raster skips PNG decode + re-pack
+                    packed = get_avatar_packed(contact_name)
+                    if not (packed and print_packed_image(printer, packed)):
+                        printer.image(Image.open(avatar_path))
                     printer.text("\n")  # spacing after avatar
                     LOG.debug(f"Printed avatar for {contact_name}")
                 except Exception as exc:
                     LOG.warning(f"Failed to print avatar for {contact_name}: {exc}")
 
-    # 3. Sender name
+    # Sender name
     printer.set(align='left', font='a', width=1, height=1, bold=True)
     printer.text(f"From: {_contact_label(sender)}\n\n")
 
-    # 4. Message body
+    # Message body, plus the blank footer line
     printer.set(align='left', font='a', width=1, height=1, bold=False)
-    for line in _wrap_text(_sanitize(body)):
-        printer.text(line + "\n")
+    printer.text("".join(line + "\n" for line in _wrap_text(_sanitize(body))) + "\n")
+
 
-    # 5. Footer
-    printer.text("\n")
+def _print_footer(printer: object) -> None:
+    """Cut the ticket (or feed paper if the printer can't cut)."""
     try:
         printer.cut()
     except Exception:
-        printer.text("\n\n\n")
+        printer.text(CUT_FALLBACK_FEED)
 
 
-def _fetch_messages(client: Client, target: str, seen: Set[str]) -> List[object]:
-    messages = client.messages.list(to=target, limit=FETCH_LIMIT)
+def _print_message(printer: object, sender: str, body: str) -> None:
+    """Print SMS receipt with optional avatar."""
+    _print_header(printer)
+    _print_section(printer, sender, body)
+    _print_footer(printer)
+
+
+def _print_messages_batch(printer: object, items: List[Tuple[str, str]]) -> None:
+    """Print several (sender, body) messages on one ticket with a single cut."""
+    _print_header(printer)
+    for i, (sender, body) in enumerate(items):
+        if i:
+            printer.set(align='center', font='a', width=1, height=1, bold=False)
+            printer.text(SEPARATOR_LINE)
+        _print_section(printer, sender, body)
+    _print_footer(printer)
+
+
+def _fetch_messages(
+    client: Client,
+    target: str,
+    seen: Container[str],
+    sent_after: Optional[dt.datetime] = None,
+) -> List[object]:
+    # Server-side date filter skips re-downloading handled messages; it is
+    # inclusive, so the SID set still drops same-second repeats
+    filters = {"date_sent_after": sent_after} if sent_after is not None else {}
+    messages = client.messages.list(to=target, limit=FETCH_LIMIT, **filters)
     unread = []
     for msg in reversed(messages):
         if msg.sid in seen:
@@ -175,7 +207,14 @@ def poll_loop() -> None:
     )
 
     client = Client(account_sid, auth_token)
-    seen_order, seen = _load_state()
+    # New SIDs are appended to STATE_FILE's .log each poll; folded in periodically
+    state: SeenStore[str] = SeenStore(STATE_FILE, "seen_sids", MAX_STATE, marker_key="last_date_sent")
+    state.load()
+    try:
+        sent_after = dt.datetime.fromisoformat(state.marker) if state.marker else None
+    except ValueError:
+        LOG.warning("Ignoring unreadable last_date_sent %r in state", state.marker)
+        sent_after = None
     last_sender: Optional[str] = None
 
     LOG.info("Kid Fax SMS poller started (polling every %ss)", POLL_SECONDS)
@@ -183,8 +222,9 @@ def poll_loop() -> None:
     # Initialize avatar directory
     ensure_avatar_dir()
 
-    # Initialize e-ink display
+    # Initialize e-ink display; refreshes (~2s) run off the polling thread
     epd = init_display()
+    renderer = CoalescingRenderer() if epd is not None else None
 
     printer = None
     while True:
@@ -196,46 +236,67 @@ def poll_loop() -> None:
                     time.sleep(10)
                     continue
 
-            new_messages = _fetch_messages(client, twilio_number, seen)
+            # Network errors are unrelated to the printer; keep the open
+            # connection instead of falling through to the re-init below
+            try:
+                new_messages = _fetch_messages(client, twilio_number, state, sent_after)
+            except Exception as exc:
+                LOG.warning("Twilio fetch failed: %s", exc)
+                continue
             printed_now = 0
-            state_dirty = False
+            new_sids: List[str] = []
+            deferred: List[object] = []
             for message in new_messages:
                 sender = message.from_ or "Unknown"
-                if not _should_print(sender):
+                printable = _should_print(sender)
+                if not printable:
                     LOG.info("Ignoring message from %s (not in allowlist)", sender)
-                    seen.add(message.sid)
-                    seen_order.append(message.sid)
-                    state_dirty = True
+                if BATCH_PRINT:
+                    deferred.append(message)  # marked handled once the batch prints
                     continue
 
-                body = message.body or ""
-                _print_message(printer, sender, body)
-                LOG.info("Printed message from %s", sender)
-                seen.add(message.sid)
-                seen_order.append(message.sid)
-                printed_now += 1
-                last_sender = _contact_label(sender)
-                state_dirty = True
-
-            if printed_now:
-                render_polling_status(epd, printed_now, last_sender)
-            if state_dirty:
-                overflow = len(seen_order) - MAX_STATE
-                if overflow > 0:
-                    for _ in range(overflow):
-                        oldest = seen_order.pop(0)
-                        seen.discard(oldest)
-                _save_state(seen_order)
+                if printable:
+                    body = message.body or ""
+                    _print_message(printer, sender, body)
+                    LOG.info("Printed message from %s", sender)
+                    printed_now += 1
+                    last_sender = _contact_label(sender)
+                state.remember(message.sid)
+                new_sids.append(message.sid)
+                # Advance only past handled messages so a failed print is retried
+                sent_after = message.date_sent or sent_after
+
+            if deferred:
+                batch = [
+                    (message.from_ or "Unknown", message.body or "")
+                    for message in deferred
+                    if _should_print(message.from_ or "Unknown")
+                ]
+                if batch:
+                    _print_messages_batch(printer, batch)
+                    LOG.info("Printed %d message(s) on one ticket", len(batch))
+                    printed_now = len(batch)
+                    last_sender = _contact_label(batch[-1][0])
+                for message in deferred:
+                    state.remember(message.sid)
+                    new_sids.append(message.sid)
+                    sent_after = message.date_sent or sent_after
+
+            if printed_now and renderer is not None:
+                renderer.submit(render_polling_status, epd, printed_now, last_sender)
+            if new_sids:
+                # Append only the new SIDs; the store compacts once the log outgrows it
+                state.append(new_sids, sent_after.isoformat() if sent_after else None)
 
         except Exception as exc:
             LOG.warning("Polling error: %s", exc)
-            printer = None  # force re-init next loop
+            printer = None  # force printer re-init next loop
         finally:
             try:
                 time.sleep(POLL_SECONDS)
             except KeyboardInterrupt:
                 LOG.info("Stopping Kid Fax poller")
-                _save_state(seen_order)
+                state.compact()
                 return
 
 
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Persistent "already printed" state shared by the Kid Fax pollers."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import secrets
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Generic, Hashable, Iterable, List, Optional, Set, TypeVar
+
+LOG = logging.getLogger("kidfax.state")
+
+T = TypeVar("T", bound=Hashable)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """
+    Replace a file's contents so a crash leaves either the old or the new file.
+
+    The temp file is created with O_EXCL under a random name (no clobbering by
+    concurrent writers), fsynced, renamed over the target with os.replace, and
+    the parent directory is fsynced so the rename itself is durable.
+    """
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644  # first write of a new file
+    temp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}-{secrets.token_hex(4)}")
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        try:
+            os.write(fd, data)
+            if hasattr(os, "fchmod"):
+                os.fchmod(fd, mode)  # keep the original permissions
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path.parent, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class SeenStore(Generic[T]):
+    """
+    Bounded set of handled message IDs, persisted as a JSON snapshot plus a log.
+
+    New IDs are appended to ``<path>.log``, one per line; an ``@value`` line
+    records the optional marker (e.g. the SMS poller's last date sent). The
+    log is folded into the snapshot with an atomic rewrite by compact(), which
+    append() calls itself once the log outgrows ``limit`` entries. Only the
+    newest ``limit`` IDs are kept.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        key: str,
+        limit: int,
+        parse: Callable[[str], T] = str,
+        marker_key: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.log_path = path.with_name(path.name + ".log")
+        self.marker: Optional[str] = None
+        self._key = key
+        self._marker_key = marker_key
+        self._parse = parse
+        self._order: Deque[T] = deque(maxlen=limit)
+        self._seen: Set[T] = set()
+        self._log_entries = 0
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._seen
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @property
+    def has_unsaved_log(self) -> bool:
+        """True if IDs were logged since the last compaction."""
+        return self._log_entries > 0
+
+    def load(self) -> None:
+        """Read the snapshot, replay the log, and fold a leftover log in."""
+        self._order.clear()
+        self.marker = None
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._order.extend(data.get(self._key, []))
+                if self._marker_key:
+                    self.marker = data.get(self._marker_key)
+        except Exception as exc:
+            LOG.warning("Could not read state file (%s), starting fresh", exc)
+            self._order.clear()
+            self.marker = None
+
+        seen = set(self._order)
+        # Replay IDs appended since the last compaction
+        try:
+            with self.log_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    entry = line.strip()
+                    if not entry:
+                        continue
+                    if entry.startswith("@"):
+                        self.marker = entry[1:]
+                        continue
+                    try:
+                        item = self._parse(entry)
+                    except ValueError:
+                        continue  # torn last line from a crash mid-append
+                    if item not in seen:
+                        seen.add(item)
+                        self._order.append(item)
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            LOG.warning("Could not read state log (%s), ignoring it", exc)
+
+        # The deque already dropped everything but the newest `limit` IDs
+        self._seen = set(self._order)
+        if self.log_path.exists():
+            self.compact()
+
+    def remember(self, item: T) -> None:
+        """Record an ID; the bounded deque evicts the oldest, so keep the set in step."""
+        if self._order and len(self._order) == self._order.maxlen:
+            self._seen.discard(self._order[0])
+        self._order.append(item)
+        self._seen.add(item)
+
+    def append(self, items: Iterable[T], marker: Optional[str] = None) -> None:
+        """Log newly remembered IDs (and the marker); compact once the log is too long."""
+        lines: List[str] = [f"{item}\n" for item in items]
+        if marker is not None:
+            self.marker = marker
+            lines.append(f"@{marker}\n")
+        self._log_entries += len(lines)
+        if self._log_entries > self._order.maxlen:
+            self.compact()
+            return
+        with self.log_path.open("a", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def compact(self) -> None:
+        """Rewrite the JSON snapshot atomically and drop the log it now covers."""
+        payload = {self._key: list(self._order)}
+        if self._marker_key and self.marker is not None:
+            payload[self._marker_key] = self.marker
+        # Temp file + os.replace, so an interrupted save never truncates the state
+        atomic_write(self.path, json.dumps(payload).encode("utf-8"))
+        self.log_path.unlink(missing_ok=True)
+        self._log_entries = 0
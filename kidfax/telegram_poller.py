@@ -10,14 +10,20 @@ import os
 import requests
 import textwrap
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Container, Dict, List, Optional
 
 from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from kidfax.avatar_manager import ensure_avatar_dir, get_avatar_path, _process_image
+from kidfax.avatar_manager import ensure_avatar_dir, get_avatar_packed, get_avatar_path, _process_image
+from kidfax.config_manager import parse_chat_contacts
 from kidfax.eink_display import init_display, render_polling_status
-from kidfax.printer import get_printer
+from kidfax.printer import encodes_ascii, get_printer, print_packed_image
+from kidfax.state_store import SeenStore
 
 LOG = logging.getLogger("kidfax.telegram")
 
@@ -35,83 +41,96 @@ def _required_env(name: str) -> str:
     return value
 
 
-def _parse_contact_map(raw: str) -> Dict[str, int]:
-    """Parse CONTACTS env var into name->chat_id mapping."""
-    contacts: Dict[str, int] = {}
-    for chunk in raw.split(','):
-        if ':' not in chunk:
-            continue
-        name, chat_id = chunk.split(':', 1)
-        name = name.strip()
-        chat_id = chat_id.strip()
-        if name and chat_id:
-            try:
-                contacts[name] = int(chat_id)
-            except ValueError:
-                LOG.warning(f"Invalid chat ID for {name}: {chat_id}")
-    return contacts
-
-
 # Telegram-specific configuration
 BOT_TOKEN = _required_env("TELEGRAM_BOT_TOKEN")
-POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "30"))
+POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "25"))
+BATCH_LIMIT = int(os.getenv("TELEGRAM_BATCH_LIMIT", "25"))  # updates per getUpdates (API max 100)
 DOWNLOAD_PHOTOS = os.getenv("TELEGRAM_DOWNLOAD_PHOTOS", "true").lower() in {"1", "true", "yes"}
 MAX_PHOTO_SIZE = int(os.getenv("TELEGRAM_MAX_PHOTO_SIZE", "5")) * 1024 * 1024  # MB to bytes
 
-CONTACTS = _parse_contact_map(os.getenv("CONTACTS", ""))
-ALLOWLIST = {int(item.strip()) for item in os.getenv("ALLOWLIST", "").split(',') if item.strip().isdigit()}
+CONTACTS = parse_chat_contacts(os.getenv("CONTACTS", ""))
+ALLOWLIST = frozenset(int(item.strip()) for item in os.getenv("ALLOWLIST", "").split(',') if item.strip().isdigit())
 STATE_FILE = Path(os.getenv("KIDFAX_STATE_FILE", DEFAULT_STATE_FILE))
 MAX_STATE = int(os.getenv("KIDFAX_STATE_LIMIT", "5000"))
+# Seen IDs are buffered in memory and logged every N IDs or T seconds (and at
+# shutdown); updates confirmed via getUpdates' offset are not re-sent anyway
+STATE_FLUSH_COUNT = 10
+STATE_FLUSH_SECONDS = 60
 HEADER_TEXT = os.getenv("KIDFAX_HEADER", "Kid Fax")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+AVATAR_ENABLED = os.getenv("AVATAR_ENABLED", "true").lower() in {"1", "true", "yes"}
+AVATAR_SIZE = int(os.getenv("AVATAR_SIZE", "96"))
+
+
+def _build_id_index(contacts: Dict[str, int]) -> Dict[int, str]:
+    """Map chat_id → name; the first contact listed wins if IDs repeat."""
+    index: Dict[int, str] = {}
+    for name, chat_id in contacts.items():
+        index.setdefault(chat_id, name)
+    return index
+
+
+CONTACTS_BY_ID = _build_id_index(CONTACTS)
 
 
 def _contact_label(chat_id: int) -> str:
     """Convert chat ID to human-readable label."""
-    for name, stored_id in CONTACTS.items():
-        if stored_id == chat_id:
-            return f"{name} ({chat_id})"
-    return str(chat_id)
+    name = CONTACTS_BY_ID.get(chat_id)
+    return f"{name} ({chat_id})" if name else str(chat_id)
 
 
 def _extract_contact_name(chat_id: int) -> Optional[str]:
     """Extract contact name from chat ID."""
-    for name, stored_id in CONTACTS.items():
-        if stored_id == chat_id:
-            return name
-    return None
+    return CONTACTS_BY_ID.get(chat_id)
+
+
+# Built once; textwrap.wrap() would construct a fresh TextWrapper on every call
+_WRAPPER = textwrap.TextWrapper(width=LINE_WIDTH)
 
 
 def _wrap_text(value: str) -> List[str]:
     """Wrap text to printer line width."""
     lines: List[str] = []
     for para in value.splitlines() or [""]:
-        wrapped = textwrap.wrap(para, width=LINE_WIDTH) or [""]
-        lines.extend(wrapped)
+        if len(para) <= LINE_WIDTH and para.isprintable():
+            # Fits on one printer line; nothing for the wrapper to do
+            lines.append(para)
+        else:
+            lines.extend(_WRAPPER.wrap(para) or [""])
     return lines
 
 
+# Most messages are plain ASCII; skip the encode/decode round-trip for them
+_ASCII_SAFE = encodes_ascii(ENCODING)
+
+
 def _sanitize(value: str) -> str:
     """Sanitize text for printer encoding."""
+    if _ASCII_SAFE and value.isascii():
+        return value
     return value.encode(ENCODING, "ignore").decode(ENCODING)
 
 
-def _load_state() -> tuple[List[int], Set[int]]:
-    """Load seen update IDs from state file."""
-    if not STATE_FILE.exists():
-        return [], set()
-    try:
-        data = json.loads(STATE_FILE.read_text(encoding="utf-8"))
-        order = data.get("seen_update_ids", [])
-        return list(order), set(order)
-    except Exception as exc:
-        LOG.warning("Could not read state file (%s), starting fresh", exc)
-        return [], set()
-
-
-def _save_state(order: List[int]) -> None:
-    """Save seen update IDs to state file."""
-    payload = {"seen_update_ids": order[-MAX_STATE:]}
-    STATE_FILE.write_text(json.dumps(payload), encoding="utf-8")
+# One keep-alive session for getUpdates, getFile and file downloads, so each
+# long-poll cycle reuses the TLS connection instead of handshaking again
+_RETRY_STATUSES = [429, 500, 502, 503, 504]
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=_RETRY_STATUSES),
+))
+# getUpdates gets its own adapter (longest mount prefix wins) with read retries
+# off: a stalled long poll would otherwise block for 3x the read timeout before
+# _get_updates' Timeout handling runs. read=False re-raises the ReadTimeout
+# itself (read=0 would wrap it as ConnectionError). Connect errors and statuses
+# still retry.
+_SESSION.mount(f"https://api.telegram.org/bot{BOT_TOKEN}/getUpdates", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=1,
+    max_retries=Retry(total=2, read=False, backoff_factor=0.3, status_forcelist=_RETRY_STATUSES),
+))
+CONNECT_TIMEOUT = 5
 
 
 def _get_updates(bot_token: str, offset: Optional[int] = None, timeout: int = 30) -> List[Dict[str, Any]]:
@@ -119,17 +138,25 @@ def _get_updates(bot_token: str, offset: Optional[int] = None, timeout: int = 30
     url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
     params = {
         'offset': offset,
+        'limit': BATCH_LIMIT,
         'timeout': timeout,
-        'allowed_updates': ['message']  # Only messages, not other update types
+        # Only messages; the API wants a JSON array, not a repeated query key
+        'allowed_updates': json.dumps(['message']),
     }
     try:
-        resp = requests.get(url, params=params, timeout=timeout + 5)
+        # Read timeout must outlast the server-side long-poll window
+        resp = _SESSION.get(url, params=params, timeout=(CONNECT_TIMEOUT, timeout + 15))
         resp.raise_for_status()
-        data = resp.json()
+        # json.loads detects UTF-8 on raw bytes; skips building resp.text first
+        data = json.loads(resp.content)
         if not data.get('ok'):
             LOG.warning(f"Telegram API error: {data}")
             return []
         return data.get('result', [])
+    except requests.exceptions.Timeout:
+        # A quiet long-poll window can run out the read timeout; not an error
+        LOG.debug("getUpdates timed out with no updates")
+        return []
     except Exception as exc:
         LOG.warning(f"Failed to get updates: {exc}")
         return []
@@ -140,7 +167,7 @@ def _download_photo(bot_token: str, file_id: str) -> Optional[Image.Image]:
     try:
         # Step 1: Get file path
         url = f"https://api.telegram.org/bot{bot_token}/getFile"
-        resp = requests.get(url, params={'file_id': file_id})
+        resp = _SESSION.get(url, params={'file_id': file_id}, timeout=(CONNECT_TIMEOUT, 15))
         resp.raise_for_status()
         data = resp.json()
         if not data.get('ok'):
@@ -154,19 +181,90 @@ def _download_photo(bot_token: str, file_id: str) -> Optional[Image.Image]:
             LOG.warning(f"Photo too large: {file_size} bytes (max {MAX_PHOTO_SIZE})")
             return None
 
-        # Step 2: Download file
+        # Step 2: Download file, streamed so an oversized body is dropped early
+        # (getFile does not always report file_size)
         file_url = f"https://api.telegram.org/file/bot{bot_token}/{file_path}"
-        resp = requests.get(file_url, timeout=30)
-        resp.raise_for_status()
+        with _SESSION.get(file_url, stream=True, timeout=(CONNECT_TIMEOUT, 30)) as resp:
+            resp.raise_for_status()
+            length = int(resp.headers.get('Content-Length') or 0)
+            if length > MAX_PHOTO_SIZE:
+                LOG.warning(f"Photo too large: {length} bytes (max {MAX_PHOTO_SIZE})")
+                return None
+            buf = BytesIO()
+            for chunk in resp.iter_content(chunk_size=65536):
+                if buf.tell() + len(chunk) > MAX_PHOTO_SIZE:
+                    LOG.warning(f"Photo exceeded {MAX_PHOTO_SIZE} bytes while downloading")
+                    return None
+                buf.write(chunk)
 
         # Step 3: Convert to PIL Image
-        img = Image.open(BytesIO(resp.content))
+        buf.seek(0)
+        img = Image.open(buf)
+        # JPEGs decode at 1/2..1/8 scale when that still covers 2x the print size
+        # (thumbnail() would do this itself, but only before the image is loaded)
+        img.draft(None, (AVATAR_SIZE * 2, AVATAR_SIZE * 2))
+        img.load()  # decode now, so a corrupt file fails here and not at print time
         return img
     except Exception as exc:
         LOG.warning(f"Failed to download photo: {exc}")
         return None
 
 
+def _fetch_photo(bot_token: str, file_id: str) -> Optional[Image.Image]:
+    """Download a photo and dither it for printing (runs on the download pool)."""
+    img = _download_photo(bot_token, file_id)
+    if img is None:
+        return None
+    try:
+        processed = _process_image(img, target_size=AVATAR_SIZE)
+    except Exception as exc:
+        LOG.warning(f"Failed to process photo: {exc}")
+        return None
+    if processed is not img:
+        img.close()  # release the full-size decode right away
+    return processed
+
+
+# Photo downloads and decoding run here so they overlap each other and printing
+_DL_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kidfax-photo")
+# Longest the poll loop waits on one photo before printing the text without it
+PHOTO_WAIT_SECONDS = 60
+
+
+def _photo_result(job: Optional[Future]) -> Optional[Image.Image]:
+    """Wait (bounded) for a prefetched photo; a stuck download means no photo."""
+    if job is None:
+        return None
+    try:
+        return job.result(timeout=PHOTO_WAIT_SECONDS)
+    except FutureTimeout:
+        LOG.warning("Photo download still running after %ss, printing without it", PHOTO_WAIT_SECONDS)
+        return None
+
+
+def _prefetch_photos(bot_token: str, updates: List[Dict[str, Any]], seen: Container[int]) -> Dict[int, Future]:
+    """Start downloads for every printable photo in a batch, keyed by update_id."""
+    jobs: Dict[int, Future] = {}
+    if not DOWNLOAD_PHOTOS:
+        return jobs
+    for update in updates:
+        if update['update_id'] in seen:
+            continue
+        chat_id = _update_chat_id(update)
+        if chat_id is None or (ALLOWLIST and chat_id not in ALLOWLIST):
+            continue
+        msg_data = _extract_message_data(update)
+        if not msg_data or not msg_data['photo']:
+            continue
+        jobs[update['update_id']] = _DL_POOL.submit(_fetch_photo, bot_token, msg_data['photo'])
+    return jobs
+
+
+def _update_chat_id(update: Dict) -> Optional[int]:
+    """Return the chat ID of a message update, or None for other update types."""
+    return update.get('message', {}).get('chat', {}).get('id')
+
+
 def _extract_message_data(update: Dict) -> Optional[Dict]:
     """Extract relevant message data from Telegram update."""
     if 'message' not in update:
@@ -196,10 +294,22 @@ def _extract_message_data(update: Dict) -> Optional[Dict]:
     }
 
 
-def _print_telegram_message(printer: object, sender_label: str, text: str, photo: Optional[Image.Image] = None) -> None:
-    """Print Telegram message with optional photo."""
+@lru_cache(maxsize=1)
+def _format_minute(minute: int) -> str:
+    """Format an epoch minute; a batch within one minute reuses the cached string."""
+    return dt.datetime.fromtimestamp(minute * 60).strftime(TIMESTAMP_FORMAT)
+
+
+def _print_telegram_message(
+    printer: object,
+    chat_id: int,
+    sender_label: str,
+    text: str,
+    photo: Optional[Image.Image] = None,
+) -> None:
+    """Print Telegram message with optional (already processed) photo."""
     # 1. Header
-    now = dt.datetime.now().strftime("%Y-%m-%d %H:%M")
+    now = _format_minute(int(time.time()) // 60)
     printer.set(align='center', font='a', width=2, height=2, bold=True)
     printer.text(f"{HEADER_TEXT}\n")
 
@@ -208,26 +318,22 @@ def _print_telegram_message(printer: object, sender_label: str, text: str, photo
     printer.text("-" * LINE_WIDTH + "\n")
 
     # 2. Avatar (existing contact avatar system)
-    avatar_enabled = os.getenv("AVATAR_ENABLED", "true").lower() in {"1", "true", "yes"}
-    if avatar_enabled:
-        # Extract chat_id from sender_label (format: "name (chat_id)")
-        chat_id_str = sender_label.split('(')[-1].rstrip(')')
-        try:
-            chat_id = int(chat_id_str)
-            contact_name = _extract_contact_name(chat_id)
-            if contact_name:
-                avatar_path = get_avatar_path(contact_name)
-                if avatar_path and avatar_path.exists():
-                    try:
-                        img = Image.open(avatar_path)
-                        printer.set(align='center')
-                        printer.text("\n")
-                        printer.image(img)
-                        printer.text("\n")
-                    except Exception as exc:
-                        LOG.warning(f"Failed to print avatar: {exc}")
-        except ValueError:
-            pass
+    if AVATAR_ENABLED:
+        contact_name = _extract_contact_name(chat_id)
+        if contact_name:
+            avatar_path = get_avatar_path(contact_name)
+            if avatar_path and avatar_path.exists():
+                try:
+                    printer.set(align='center')
+                    printer.text("\n")
+                    # Pre-packed raster skips PNG decode + re-pack
+                    packed = get_avatar_packed(contact_name)
+                    if not (packed and print_packed_image(printer, packed)):
+                        with Image.open(avatar_path) as avatar:
+                            printer.image(avatar)
+                    printer.text("\n")
+                except Exception as exc:
+                    LOG.warning(f"Failed to print avatar: {exc}")
 
     # 3. Sender name
     printer.set(align='left', font='a', width=1, height=1, bold=True)
@@ -240,16 +346,12 @@ def _print_telegram_message(printer: object, sender_label: str, text: str, photo
             printer.text(line + "\n")
         printer.text("\n")
 
-    # 5. Photo (if present) - REUSE AVATAR PROCESSING
+    # 5. Photo (if present) - dithered by _fetch_photo off the poll thread
     if photo:
         try:
-            processed = _process_image(
-                photo,
-                target_size=int(os.getenv("AVATAR_SIZE", "96"))
-            )
             printer.set(align='center')
             printer.text("\n")
-            printer.image(processed)
+            printer.image(photo)
             printer.text("\n")
         except Exception as exc:
             LOG.warning(f"Failed to print photo: {exc}")
@@ -271,7 +373,11 @@ def poll_loop() -> None:
         format="[%(asctime)s] %(levelname)s: %(message)s",
     )
 
-    seen_order, seen = _load_state()
+    # New update IDs are appended to STATE_FILE's .log; folded in periodically
+    state: SeenStore[int] = SeenStore(STATE_FILE, "seen_update_ids", MAX_STATE, parse=int)
+    state.load()
+    pending_ids: List[int] = []
+    last_flush = time.monotonic()
     last_sender: Optional[str] = None
     last_update_id: Optional[int] = None
 
@@ -284,93 +390,98 @@ def poll_loop() -> None:
     epd = init_display()
 
     printer = None
-    while True:
-        try:
-            if printer is None:
-                printer = get_printer(allow_dummy=ALLOW_DUMMY)
-                if printer is None:
-                    LOG.error("Printer is not available. Retrying in 10 seconds...")
-                    time.sleep(10)
-                    continue
-
-            # Get new updates
-            offset = last_update_id + 1 if last_update_id else None
-            updates = _get_updates(bot_token, offset=offset, timeout=POLL_TIMEOUT)
-
-            printed_now = 0
-            state_dirty = False
-
-            for update in updates:
-                update_id = update['update_id']
-                last_update_id = update_id  # Track for offset
-
-                if update_id in seen:
-                    continue
-
-                msg_data = _extract_message_data(update)
-                if not msg_data:
-                    seen.add(update_id)
-                    seen_order.append(update_id)
-                    state_dirty = True
-                    continue
-
-                chat_id = msg_data['chat_id']
-
-                # Check allowlist
-                if ALLOWLIST and chat_id not in ALLOWLIST:
-                    LOG.info("Ignoring message from chat_id %s (not in allowlist)", chat_id)
-                    seen.add(update_id)
-                    seen_order.append(update_id)
-                    state_dirty = True
-                    continue
-
-                # Resolve sender label
-                sender_label = _contact_label(chat_id)
-
-                # Download photo if present
-                photo_img = None
-                if DOWNLOAD_PHOTOS and msg_data['photo']:
-                    photo_img = _download_photo(bot_token, msg_data['photo'])
-
-                # Print message
-                _print_telegram_message(
-                    printer,
-                    sender_label,
-                    msg_data['text'],
-                    photo=photo_img
-                )
-
-                LOG.info("Printed message from %s", sender_label)
-                seen.add(update_id)
-                seen_order.append(update_id)
-                printed_now += 1
-                last_sender = sender_label
-                state_dirty = True
-
-            # Update e-ink display
-            if printed_now:
-                render_polling_status(epd, printed_now, last_sender)
-
-            # Save state
-            if state_dirty:
-                overflow = len(seen_order) - MAX_STATE
-                if overflow > 0:
-                    for _ in range(overflow):
-                        oldest = seen_order.pop(0)
-                        seen.discard(oldest)
-                _save_state(seen_order)
-
-        except Exception as exc:
-            LOG.warning("Polling error: %s", exc)
-            printer = None
-        finally:
+    try:
+        while True:
             try:
-                # No explicit sleep needed - long polling handles timing
-                pass
-            except KeyboardInterrupt:
-                LOG.info("Stopping Kid Fax Telegram poller")
-                _save_state(seen_order)
-                return
+                if printer is None:
+                    printer = get_printer(allow_dummy=ALLOW_DUMMY)
+                    if printer is None:
+                        LOG.error("Printer is not available. Retrying in 10 seconds...")
+                        time.sleep(10)
+                        continue
+
+                # Get new updates
+                offset = last_update_id + 1 if last_update_id else None
+                updates = _get_updates(bot_token, offset=offset, timeout=POLL_TIMEOUT)
+
+                printed_now = 0
+
+                # Submit all photo downloads up front, then reap them in print order
+                photo_jobs = _prefetch_photos(bot_token, updates, state)
+
+                for update in updates:
+                    update_id = update['update_id']
+                    last_update_id = update_id  # Track for offset
+
+                    if update_id in state:
+                        continue
+
+                    chat_id = _update_chat_id(update)
+                    if chat_id is None:
+                        state.remember(update_id)
+                        pending_ids.append(update_id)
+                        continue
+
+                    # Check allowlist before parsing the rest of the message
+                    if ALLOWLIST and chat_id not in ALLOWLIST:
+                        LOG.info("Ignoring message from chat_id %s (not in allowlist)", chat_id)
+                        state.remember(update_id)
+                        pending_ids.append(update_id)
+                        continue
+
+                    msg_data = _extract_message_data(update)
+                    if not msg_data:
+                        state.remember(update_id)
+                        pending_ids.append(update_id)
+                        continue
+
+                    # Resolve sender label
+                    sender_label = _contact_label(chat_id)
+
+                    # Photo (if present) was already downloading and dithering in the background
+                    photo_img = _photo_result(photo_jobs.get(update_id))
+
+                    # Print message; only printer failures force a reconnect
+                    try:
+                        _print_telegram_message(
+                            printer,
+                            chat_id,
+                            sender_label,
+                            msg_data['text'],
+                            photo=photo_img
+                        )
+                    except Exception:
+                        printer = None
+                        raise
+
+                    LOG.info("Printed message from %s", sender_label)
+                    state.remember(update_id)
+                    pending_ids.append(update_id)
+                    printed_now += 1
+                    last_sender = sender_label
+
+                # Update e-ink display
+                if printed_now:
+                    render_polling_status(epd, printed_now, last_sender)
+
+                # Save state
+                if pending_ids and (
+                    len(pending_ids) >= STATE_FLUSH_COUNT
+                    or time.monotonic() - last_flush >= STATE_FLUSH_SECONDS
+                ):
+                    # Append only the new IDs; the store compacts once the log outgrows it
+                    state.append(pending_ids)
+                    pending_ids.clear()
+                    last_flush = time.monotonic()
+
+            except Exception as exc:
+                LOG.warning("Polling error: %s", exc)
+            # No explicit sleep needed - long polling handles timing
+    finally:
+        # Ctrl-C (logged by main) or a fatal error: compact anything still
+        # buffered (or logged) into the state file
+        if pending_ids or state.has_unsaved_log:
+            state.compact()
 
 
 def main() -> None:
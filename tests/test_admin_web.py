@@ -0,0 +1,87 @@
+"""Tests for kidfax.admin_web request validation."""
+import base64
+import importlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+ENV_TEXT = "CONTACTS=grandma:+15551112222\nALLOWLIST=+15551112222\n"
+
+
+def setUpModule():
+    global admin_web, ENV_PATH, AUTH
+    tmp = tempfile.mkdtemp()
+    ENV_PATH = Path(tmp) / ".env"
+    # admin_web reads its configuration once at import
+    os.environ["ENV_FILE_PATH"] = str(ENV_PATH)
+    os.environ["ADMIN_PASSWORD"] = "test-password"
+    os.environ["AVATAR_DIR"] = str(Path(tmp) / "avatars")
+    admin_web = importlib.import_module("kidfax.admin_web")
+    AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:test-password").decode()}
+
+
+class BulkReplaceContactsTest(unittest.TestCase):
+    def setUp(self):
+        ENV_PATH.write_text(ENV_TEXT, encoding="utf-8")
+        self.client = admin_web.app.test_client()
+
+    def _post(self, contacts):
+        return self.client.post(
+            "/admin/contacts/bulk_replace", json={"contacts": contacts}, headers=AUTH
+        )
+
+    def test_rejects_non_string_values(self):
+        for entry in (
+            {"name": None, "number": "+15553334444"},
+            {"name": "uncle", "number": None},
+            {"name": 42, "number": "+15553334444"},
+            {"name": "uncle", "number": 15553334444},
+            {"name": {"first": "uncle"}, "number": "+15553334444"},
+            {"name": ["uncle"], "number": "+15553334444"},
+        ):
+            with self.subTest(entry=entry):
+                resp = self._post([entry])
+                self.assertEqual(resp.status_code, 400)
+                self.assertFalse(resp.get_json()["success"])
+                self.assertEqual(ENV_PATH.read_text(encoding="utf-8"), ENV_TEXT)
+
+    def test_replaces_valid_contacts(self):
+        resp = self._post([{"name": "uncle", "number": "+15553334444"}])
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("uncle:+15553334444", ENV_PATH.read_text(encoding="utf-8"))
+
+
+class StringFieldValidationTest(unittest.TestCase):
+    ROUTES = [
+        ("/admin/contacts/add", {"name": "uncle", "number": "+15553334444"}),
+        ("/admin/contacts/edit", {"old_name": "grandma", "new_name": "nana", "new_number": "+15551112222"}),
+        ("/admin/contacts/delete", {"name": "grandma"}),
+        ("/admin/allowlist/add", {"number": "+15553334444"}),
+        ("/admin/allowlist/delete", {"number": "+15551112222"}),
+        ("/admin/avatars/delete", {"contact_name": "grandma"}),
+    ]
+
+    def setUp(self):
+        ENV_PATH.write_text(ENV_TEXT, encoding="utf-8")
+        self.client = admin_web.app.test_client()
+
+    def test_non_string_fields_are_rejected(self):
+        for route, body in self.ROUTES:
+            for key in body:
+                for bad in (None, 42, {"x": 1}, ["x"]):
+                    with self.subTest(route=route, key=key, value=bad):
+                        resp = self.client.post(route, json={**body, key: bad}, headers=AUTH)
+                        self.assertEqual(resp.status_code, 400)
+                        self.assertFalse(resp.get_json()["success"])
+        self.assertEqual(ENV_PATH.read_text(encoding="utf-8"), ENV_TEXT)
+
+    def test_non_object_body_is_rejected(self):
+        for route, _ in self.ROUTES:
+            with self.subTest(route=route):
+                resp = self.client.post(route, json=["not", "an", "object"], headers=AUTH)
+                self.assertEqual(resp.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
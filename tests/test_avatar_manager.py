@@ -0,0 +1,26 @@
+"""Tests for kidfax.avatar_manager raster packing."""
+import unittest
+
+from PIL import Image
+
+from kidfax.avatar_manager import _pack_image
+
+
+class PackImageTest(unittest.TestCase):
+    def test_white_row_padding_stays_white(self):
+        # 100px wide: 13 bytes per row, the last holding 4 pixels + 4 padding bits
+        packed = _pack_image(Image.new("1", (100, 3), 1))
+        self.assertEqual(packed[:4], b"\x64\x00\x03\x00")
+        self.assertEqual(packed[4:], bytes(13 * 3))
+
+    def test_black_row_padding_stays_white(self):
+        packed = _pack_image(Image.new("1", (100, 2), 0))
+        self.assertEqual(packed[4:], (b"\xff" * 12 + b"\xf0") * 2)
+
+    def test_byte_aligned_width_is_unmasked(self):
+        packed = _pack_image(Image.new("1", (16, 1), 0))
+        self.assertEqual(packed[4:], b"\xff\xff")
+
+
+if __name__ == "__main__":
+    unittest.main()
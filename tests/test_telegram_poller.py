@@ -0,0 +1,55 @@
+"""Tests for kidfax.telegram_poller network handling."""
+import importlib
+import importlib.util
+import os
+import socket
+import threading
+import unittest
+from unittest import mock
+
+TOKEN = "123456:test-token"
+
+
+@unittest.skipUnless(importlib.util.find_spec("requests"), "requests not installed")
+class GetUpdatesTimeoutTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault("TELEGRAM_BOT_TOKEN", TOKEN)
+        cls.tp = importlib.import_module("kidfax.telegram_poller")
+        import requests
+        cls.requests = requests
+
+    def setUp(self):
+        # Accepts connections but never answers, like a long poll with no updates
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.addCleanup(self.server.close)
+        self.clients = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        try:
+            while True:
+                self.clients.append(self.server.accept()[0])
+        except OSError:
+            pass
+
+    def test_read_timeout_returns_empty_without_warning(self):
+        tp = self.tp
+        # Route the request through the real getUpdates adapter to the stalled server
+        adapter = tp._SESSION.get_adapter(f"https://api.telegram.org/bot{tp.BOT_TOKEN}/getUpdates")
+        local = self.requests.Session()
+        local.mount("http://", adapter)
+        port = self.server.getsockname()[1]
+
+        def stalled_get(url, params=None, timeout=None):
+            return local.get(f"http://127.0.0.1:{port}/getUpdates", params=params, timeout=(1, 0.2))
+
+        with mock.patch.object(tp._SESSION, "get", stalled_get):
+            with self.assertNoLogs("kidfax.telegram", level="WARNING"):
+                self.assertEqual(tp._get_updates(tp.BOT_TOKEN, timeout=1), [])
+
+
+if __name__ == "__main__":
+    unittest.main()